@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # local
     'reviews',
@@ -54,6 +55,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'reviews.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',                # corsheaders
@@ -62,6 +64,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'reviews.routers.PrimaryStickinessMiddleware',
 ]
 
 CORS_ORIGIN_WHITELIST = (
@@ -103,6 +106,28 @@ DATABASES = {
     }
 }
 
+# Read replicas with the same credentials, safe requests read from them (see reviews.routers)
+DB_REPLICA_HOSTS = env.list("DB_REPLICA_HOSTS", [])
+for number, host in enumerate(DB_REPLICA_HOSTS, start=1):
+    DATABASES[f'replica_{number}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['reviews.routers.ReplicaRouter']
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'review-service',
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int("CACHE_MAX_ENTRIES", 10000),
+        },
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -147,4 +172,47 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
     'ORDERING_PARAM': 'order',
-}
\ No newline at end of file
+}
+
+# Amount of shop links and domains, whose shops are remembered by reviews.shops.ShopResolver
+SHOP_LINKS_CACHE_SIZE = env.int("SHOP_LINKS_CACHE_SIZE", 10000)
+# Amount of the latest reviews embedded into a shop detail and into shops listed with ?expand=recent_reviews
+SHOP_RECENT_REVIEWS = env.int("SHOP_RECENT_REVIEWS", 5)
+# Amount of hosts, whose split by reviews.domains.DomainExtractor is remembered
+DOMAINS_CACHE_SIZE = env.int("DOMAINS_CACHE_SIZE", 10000)
+
+# Cache alias and timeout in seconds of reviews.cache.ResultCache, which keeps results of read endpoints
+RESULT_CACHE_ALIAS = env.str("RESULT_CACHE_ALIAS", "default")
+RESULT_CACHE_TIMEOUT = env.int("RESULT_CACHE_TIMEOUT", 60)
+
+# Seconds, during which reads of a client stick to the primary database after its write
+REPLICA_STICKY_SECONDS = env.int("REPLICA_STICKY_SECONDS", 5)
+REPLICA_STICKY_COOKIE = env.str("REPLICA_STICKY_COOKIE", "primary_until")
+
+# Seconds, during which a result of a replica's health check is trusted
+REPLICA_HEALTH_CHECK_INTERVAL = env.int("REPLICA_HEALTH_CHECK_INTERVAL", 10)
+
+# Share of requests, whose SQL queries, view and rendering are timed (reviews.metrics), from 0 to 1
+METRICS_SAMPLE_RATE = env.float("METRICS_SAMPLE_RATE", 1.0)
+
+# Bytes of a JSON array, which bulk creation of reviews loads into memory at most. NDJSON bodies are streamed,
+# so larger imports must be sent as NDJSON
+REVIEW_BULK_JSON_MAX_SIZE = env.int("REVIEW_BULK_JSON_MAX_SIZE", 10 * 1024 * 1024)
+
+# Async create mode (reviews.submissions): reviews are queued and created by a worker in batches.
+# It's used for every create, when REVIEW_SUBMISSIONS_ASYNC is on, or for requests with "Prefer: respond-async"
+REVIEW_SUBMISSIONS_ASYNC = env.bool("REVIEW_SUBMISSIONS_ASYNC", False)
+REVIEW_SUBMISSIONS_BATCH_SIZE = env.int("REVIEW_SUBMISSIONS_BATCH_SIZE", 500)
+# Runs the worker in a thread of the web process instead of process_review_submissions command
+REVIEW_SUBMISSIONS_WORKER_THREAD = env.bool("REVIEW_SUBMISSIONS_WORKER_THREAD", False)
+REVIEW_SUBMISSIONS_POLL_INTERVAL = env.float("REVIEW_SUBMISSIONS_POLL_INTERVAL", 1.0)
+
+# Change feed (reviews.changes): changes younger than the lag in seconds aren't served yet, so a transaction,
+# which is committed after a later one, doesn't slip behind a consumer's cursor. Transactions writing reviews
+# must be shorter than the lag, bulk writes and ingested chunks are rolled back otherwise
+REVIEW_CHANGES_LAG = env.float("REVIEW_CHANGES_LAG", 2.0)
+# Days, during which tombstones of deleted reviews are kept by prune_review_deletions command
+REVIEW_DELETIONS_RETENTION_DAYS = env.int("REVIEW_DELETIONS_RETENTION_DAYS", 30)
+
+# Reviews created earlier than this amount of days ago are moved to ArchivedReview by archive_reviews command
+REVIEW_ARCHIVE_AFTER_DAYS = env.int("REVIEW_ARCHIVE_AFTER_DAYS", 365)
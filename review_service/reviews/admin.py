@@ -1,6 +1,99 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.postgres.search import SearchQuery
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
 
-from .models import Review, Shop
+from .models import Review, Shop, SEARCH_CONFIG
 
-admin.site.register(Review)
-admin.site.register(Shop)
+# Changelists with less rows, than estimated by the planner, are counted exactly
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+def estimate_count(queryset):
+    """
+    Returns PostgreSQL's estimate of amount of rows of the queryset: statistics of the table for
+    a whole table and the planner's estimate for a filtered one. None in other databases
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            # Tables, which have never been analyzed, have no statistics
+            return int(row[0]) if row and row[0] >= 0 else None
+
+        sql, params = queryset.values("pk").order_by().query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        return plan[0]["Plan"]["Plan Rows"]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator of large tables, which doesn't run COUNT(*) over rows, that are estimated to be too many"""
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+
+class ReviewChangeList(ChangeList):
+
+    def get_queryset(self, request):
+        """Content isn't shown in the list, so it isn't loaded and decompressed"""
+        return super().get_queryset(request).defer("content")
+
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    list_display = ("title", "shop", "stars", "author_email", "date_created")
+    list_select_related = ("shop",)
+    autocomplete_fields = ("shop",)
+    readonly_fields = ("excerpt", "date_created", "date_updated")
+    date_hierarchy = "date_created"
+    # Searched by get_search_results, the fields are listed only to show the search box
+    search_fields = ("author_email", "title", "shop__domain_name")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return ReviewChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Finds reviews by exact author_email, by exact domain_name of their shop and by words, so every
+        condition is served by an index: full-text search of title and content in PostgreSQL.
+        Other databases fall back to a non-case-sensitive containing of title
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        shop_pks = list(Shop.objects.filter(domain_name=search_term.lower()).values_list("pk", flat=True))
+        if connections[queryset.db].vendor == "postgresql":
+            title_condition = Q(search_vector=SearchQuery(search_term, config=SEARCH_CONFIG, search_type="websearch"))
+        else:
+            title_condition = Q(title__icontains=search_term)
+
+        return queryset.filter(Q(author_email=search_term) | Q(shop_id__in=shop_pks) | title_condition), False
+
+
+@admin.register(Shop)
+class ShopAdmin(admin.ModelAdmin):
+    list_display = ("name", "domain_name", "reviews_count", "rating")
+    # Non-case-sensitive containing is served by trigram indexes of UPPER(domain_name) and UPPER(name)
+    # (migrations 0010 and 0020), it is also used by autocomplete of ReviewAdmin
+    search_fields = ("domain_name", "name")
+    readonly_fields = (
+        "reviews_count", "stars_sum", "rating", "stars_1", "stars_2", "stars_3", "stars_4", "stars_5", "date_updated"
+    )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
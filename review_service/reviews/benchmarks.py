@@ -0,0 +1,119 @@
+import math
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Review, Shop
+
+
+class Scenario:
+    """Named request to an endpoint, make_request(client, iteration) makes it with the test client"""
+
+    def __init__(self, name: str, make_request):
+        self.name = name
+        self.make_request = make_request
+
+
+def get_scenarios():
+    """Returns scenarios of every endpoint, their params are picked from the seeded data"""
+    reviews_url, shops_url = reverse("review-list"), reverse("shops")
+    top_author = Review.objects.values("author_email").annotate(
+        reviews=Count("id")
+    ).order_by("-reviews").values_list("author_email", flat=True).first()
+    review_urls = [reverse("review-detail", args=[pk]) for pk in Review.objects.values_list("id", flat=True)[:100]]
+    shop_links = list(Shop.objects.values_list("link", flat=True)[:100])
+    shop_name = Shop.objects.values_list("domain_name", flat=True).first()
+
+    scenarios = [
+        Scenario("reviews_list", lambda client, i: client.get(reviews_url)),
+        Scenario("reviews_list_author", lambda client, i: client.get(reviews_url, {"author": top_author})),
+        Scenario("reviews_create", lambda client, i: client.post(reviews_url, {
+            "title": f"Benchmark #{i}",
+            "content": "Created by a benchmark",
+            "stars": i % 5 + 1,
+            "author_email": f"benchmark{i}@email.com",
+            "shop_link": shop_links[i % len(shop_links)],
+        }, content_type="application/json")),
+        Scenario("reviews_partial_update", lambda client, i: client.patch(
+            review_urls[i % len(review_urls)], {"stars": i % 5 + 1}, content_type="application/json"
+        )),
+        Scenario("shops_list", lambda client, i: client.get(shops_url)),
+        Scenario("shops_name", lambda client, i: client.get(shops_url, {"name": shop_name})),
+    ]
+    for order in ("reviews", "-reviews", "rate", "-rate"):
+        scenarios.append(Scenario(
+            f"shops_order_{order.replace('-', 'desc_')}",
+            lambda client, i, order=order: client.get(shops_url, {"order": order}),
+        ))
+    return scenarios
+
+
+def percentile(sorted_values, percent: float):
+    """Nearest-rank percentile of sorted values"""
+    return sorted_values[max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)]
+
+
+def run_scenario(client, scenario: Scenario, requests: int, warmup: int, warm_cache: bool):
+    """
+    Makes warmup requests and then measured ones one after another. Without warm_cache the result cache
+    is cleared before every measured request, so every request reaches the database
+    """
+    for iteration in range(warmup):
+        scenario.make_request(client, iteration)
+
+    latencies, queries, errors = [], [], 0
+    for iteration in range(warmup, warmup + requests):
+        if not warm_cache:
+            caches[settings.RESULT_CACHE_ALIAS].clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = scenario.make_request(client, iteration)
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(captured))
+        errors += response.status_code >= 400
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / requests * 1000, 3),
+        "throughput_rps": round(requests / sum(latencies), 1),
+        "queries_per_request": round(sum(queries) / requests, 2),
+        "max_queries": max(queries),
+    }
+
+
+def run_benchmarks(requests: int = 200, warmup: int = 10, names=None, warm_cache: bool = False):
+    """Runs scenarios, all of them or ones with passed names, in-process and returns a JSON serializable report"""
+    client = Client()
+    scenarios = [scenario for scenario in get_scenarios() if not names or scenario.name in names]
+    return {
+        "commit": get_commit(),
+        "database": connection.vendor,
+        "dataset": {"shops": Shop.objects.count(), "reviews": Review.objects.count()},
+        "warm_cache": warm_cache,
+        "scenarios": {
+            scenario.name: run_scenario(client, scenario, requests, warmup, warm_cache) for scenario in scenarios
+        },
+    }
+
+
+def get_commit():
+    """Returns hash of the checked out commit, so reports of different commits can be compared"""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
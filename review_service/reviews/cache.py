@@ -0,0 +1,85 @@
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+SHOPS_NAMESPACE = "shops"
+
+
+def reviews_namespace(author_email: str = None):
+    """Namespace of all review lists or, if author_email is passed, of lists filtered by the author"""
+    return f"reviews:author:{author_email}" if author_email else "reviews"
+
+
+def review_namespace(pk):
+    return f"review:{pk}"
+
+
+class ResultCache:
+    """
+    Keeps results of read endpoints in a Django cache, so any backend can be plugged in.
+    Entries live for a timeout and the backend evicts least recently used ones when it's full
+    (LocMemCache with MAX_ENTRIES does so). Every entry belongs to namespaces, e.g. "reviews"
+    or "review:1". Its key contains current versions of them, so bumping a namespace's version
+    on a write makes exactly its entries unreachable
+    """
+
+    def __init__(self, alias: str, timeout: int):
+        self.alias = alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key: str):
+        """Returns cached value or None, counts hits and misses"""
+        value = self.cache.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value):
+        self.cache.set(key, value, self.timeout)
+
+    def make_key(self, endpoint: str, params: dict, namespaces):
+        """Makes key from endpoint, normalized params and current versions of namespaces"""
+        normalized_params = sorted((name, sorted(values)) for name, values in params.items())
+        versions = self.get_versions(namespaces)
+        raw_key = repr((endpoint, normalized_params, sorted(versions.items())))
+        return f"results:{hashlib.md5(raw_key.encode()).hexdigest()}"
+
+    def get_versions(self, namespaces):
+        """Returns {namespace: version}, namespace without a version gets a new one"""
+        version_keys = {self.version_key(namespace): namespace for namespace in namespaces}
+        versions = self.cache.get_many(list(version_keys))
+        for version_key in version_keys:
+            if version_key not in versions:
+                versions[version_key] = uuid.uuid4().hex
+                if not self.cache.add(version_key, versions[version_key], None):
+                    versions[version_key] = self.cache.get(version_key, versions[version_key])
+        return {version_keys[version_key]: version for version_key, version in versions.items()}
+
+    def invalidate(self, *namespaces):
+        """Gives new versions to namespaces, so all their entries are never read again"""
+        self.cache.set_many({self.version_key(namespace): uuid.uuid4().hex for namespace in namespaces}, None)
+
+    @staticmethod
+    def version_key(namespace: str):
+        return f"results-version:{hashlib.md5(namespace.encode()).hexdigest()}"
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+result_cache = ResultCache(alias=settings.RESULT_CACHE_ALIAS, timeout=settings.RESULT_CACHE_TIMEOUT)
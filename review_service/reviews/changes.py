@@ -0,0 +1,100 @@
+import base64
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.fields import DateTimeField
+
+from .models import ArchivedReview, Review, ReviewDeletion
+from .pagination import keyset_filter
+
+# Positions of the last changed review and the last tombstone a consumer has got, None dates mean the beginning
+ChangesCursor = namedtuple("ChangesCursor", "updated review_id deleted deletion_id")
+START = ChangesCursor(None, 0, None, 0)
+
+UPSERT, DELETE = "upsert", "delete"
+
+
+def encode_cursor(cursor: ChangesCursor):
+    position = "|".join("" if value is None else str(value) for value in (
+        cursor.updated and cursor.updated.isoformat(), cursor.review_id,
+        cursor.deleted and cursor.deleted.isoformat(), cursor.deletion_id,
+    ))
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(encoded: str):
+    """Returns ChangesCursor of an encoded one, raises ValueError on malformed cursor"""
+    try:
+        updated, review_id, deleted, deletion_id = base64.urlsafe_b64decode(encoded.encode()).decode().split("|")
+        return ChangesCursor(
+            parse_position_date(updated), int(review_id), parse_position_date(deleted), int(deletion_id)
+        )
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+
+
+def parse_position_date(value: str):
+    if not value:
+        return None
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f"Invalid date {value}")
+    return date
+
+
+def get_changes(cursor: ChangesCursor, limit: int, values_serializer):
+    """
+    Returns at most limit changes after cursor from the oldest: reviews created or updated, represented
+    by values_serializer, and tombstones of deleted ones. Both are read by index range scans
+    of at most limit + 1 rows, so a page costs the same however large the table is.
+    Returns (changes, next cursor, whether there are more changes)
+    """
+    horizon = timezone.now() - timedelta(seconds=settings.REVIEW_CHANGES_LAG)
+    columns = {*values_serializer.columns, "id", "date_updated"}
+    reviews = Review.objects.filter(date_updated__lte=horizon)
+    if cursor.updated is not None:
+        reviews = reviews.filter(keyset_filter("date_updated", cursor.updated, "id", cursor.review_id))
+    reviews = reviews.order_by("date_updated", "id").values(*columns)[:limit + 1]
+    deletions = ReviewDeletion.objects.filter(date_deleted__lte=horizon)
+    if cursor.deleted is not None:
+        deletions = deletions.filter(keyset_filter("date_deleted", cursor.deleted, "id", cursor.deletion_id))
+    deletions = deletions.order_by("date_deleted", "id").values("id", "review_id", "date_deleted")[:limit + 1]
+
+    merged = sorted(
+        [(row["date_updated"], UPSERT, row["id"], row) for row in reviews] +
+        [(row["date_deleted"], DELETE, row["id"], row) for row in deletions],
+        key=lambda change: change[:3]
+    )
+    page = merged[:limit]
+
+    for date, operation, pk, row in page:
+        if operation == UPSERT:
+            cursor = cursor._replace(updated=date, review_id=pk)
+        else:
+            cursor = cursor._replace(deleted=date, deletion_id=pk)
+
+    represent_date = DateTimeField().to_representation
+    upserted = [row for date, operation, pk, row in page if operation == UPSERT]
+    representations = iter(values_serializer.to_representation(upserted))
+    changes = [
+        {"op": UPSERT, "id": pk, "date": represent_date(date), "review": next(representations)} if operation == UPSERT
+        else {"op": DELETE, "id": row["review_id"], "date": represent_date(date)}
+        for date, operation, pk, row in page
+    ]
+
+    return changes, cursor, len(merged) > limit
+
+
+def get_last_change_dates():
+    """
+    Returns dates of the latest update, deletion and archival of reviews, any change of any list of reviews
+    moves one of them. They are read by one query from the ends of three indexes, None if there are no reviews
+    """
+    return Review.objects.order_by("-date_updated").values_list("date_updated").annotate(
+        date_deleted=Subquery(ReviewDeletion.objects.order_by("-date_deleted").values("date_deleted")[:1]),
+        date_archived=Subquery(ArchivedReview.objects.order_by("-date_archived").values("date_archived")[:1]),
+    ).first() or (None, None, None)
@@ -0,0 +1,163 @@
+import re
+import socket
+import sys
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import scheme_chars
+
+import idna
+from django.conf import settings
+
+# Snapshot of https://publicsuffix.org/list/public_suffix_list.dat, the same one tldextract bundles.
+# It is updated by replacing the file, nothing is fetched at runtime
+SNAPSHOT_PATH = Path(__file__).resolve().parent / "data" / "public_suffix_list.dat"
+PRIVATE_DOMAINS_MARKER = "// ===BEGIN PRIVATE DOMAINS==="
+
+SCHEME_RE = re.compile(r"^([" + scheme_chars + r"]+:)?//")
+IP_RE = re.compile(
+    r"^(([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5])\.){3}([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5])$"
+)
+
+# Kinds of rules, which are kept in trie nodes under None key
+RULE, EXCEPTION = 1, 2
+WILDCARD = "*"
+
+DomainParts = namedtuple("DomainParts", "subdomain domain suffix")
+
+
+class PublicSuffixTrie:
+    """
+    ICANN rules of the public suffix list in a trie of labels from the top-level domain down, e.g. "co.uk"
+    is root["uk"]["co"]. A node is a dict of child labels, the kind of its rule is kept under None key.
+    Nodes without children share a couple of leaf dicts, so the whole list takes a few thousand dicts
+    """
+    _leaves = {RULE: {None: RULE}, EXCEPTION: {None: EXCEPTION}}
+
+    def __init__(self, rules):
+        root = {}
+        for rule in rules:
+            kind = EXCEPTION if rule.startswith("!") else RULE
+            node = root
+            for label in reversed(rule.lstrip("!").split(".")):
+                node = node.setdefault(sys.intern(label), {})
+            node[None] = kind
+        self.root = self._compile(root)
+
+    @classmethod
+    def from_snapshot(cls, path=SNAPSHOT_PATH):
+        text = Path(path).read_text(encoding="utf-8")
+        return cls(parse_rules(text.partition(PRIVATE_DOMAINS_MARKER)[0]))
+
+    @classmethod
+    def _compile(cls, node):
+        if len(node) == 1 and None in node:
+            return cls._leaves[node[None]]
+        return {label: child if label is None else cls._compile(child) for label, child in node.items()}
+
+    def suffix_index(self, labels):
+        """
+        Returns index of the first label of the public suffix in lowercase labels, len(labels) if there is none.
+        The longest matching rule wins, an exception rule makes the suffix one label shorter like in tldextract
+        """
+        index = len(labels)
+        node = self.root
+        for position in range(len(labels) - 1, -1, -1):
+            wildcard = WILDCARD in node
+            node = node.get(labels[position])
+            kind = node.get(None) if node is not None else None
+            if kind == EXCEPTION:
+                index = position + 1
+            elif kind == RULE or wildcard:
+                index = position
+            if node is None:
+                break
+        return index
+
+
+def parse_rules(text: str):
+    """Returns rules of public suffix list text, comments and blank lines are skipped"""
+    rules = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("//"):
+            rules.append(line.split()[0])
+    return rules
+
+
+def get_host(link: str):
+    """Returns host of link without scheme, path, credentials, port and the trailing dot"""
+    return (
+        SCHEME_RE.sub("", link)
+        .partition("/")[0]
+        .partition("?")[0]
+        .partition("#")[0]
+        .split("@")[-1]
+        .partition(":")[0]
+        .strip()
+        .rstrip(".")
+    )
+
+
+def decode_label(label: str):
+    """Returns lowercase label, punycode labels are decoded as rules of the list are in unicode"""
+    lowered = label.lower()
+    if lowered.startswith("xn--"):
+        try:
+            return idna.decode(label.encode("ascii")).lower()
+        except (UnicodeError, IndexError):
+            pass
+    return lowered
+
+
+def looks_like_ip(host: str):
+    if not host[0].isdigit():
+        return False
+    try:
+        socket.inet_aton(host)
+    except UnicodeError:
+        return bool(IP_RE.match(host))
+    except OSError:
+        return False
+    return True
+
+
+class DomainExtractor:
+    """
+    Splits links into subdomain, domain and public suffix with the trie of the bundled public suffix list,
+    the same way as tldextract does without private domains. The trie is built once per process,
+    splits of hosts are remembered in a bounded LRU
+    """
+
+    def __init__(self, maxsize: int, path=SNAPSHOT_PATH):
+        self.path = path
+        self._trie = None
+        self._lock = threading.Lock()
+        self.split_host = lru_cache(maxsize=maxsize)(self._split_host)
+
+    def load(self):
+        """Builds the trie, it is called by ReviewsConfig.ready(), so requests never wait for it"""
+        with self._lock:
+            if self._trie is None:
+                self._trie = PublicSuffixTrie.from_snapshot(self.path)
+        return self._trie
+
+    def extract(self, link: str):
+        return self.split_host(get_host(link))
+
+    def _split_host(self, host: str):
+        labels = host.split(".")
+        trie = self._trie or self.load()
+        index = trie.suffix_index([decode_label(label) for label in labels])
+
+        suffix = ".".join(labels[index:])
+        if not suffix and host and looks_like_ip(host):
+            return DomainParts("", host, "")
+
+        subdomain = ".".join(labels[:index - 1]) if index else ""
+        domain = labels[index - 1] if index else ""
+        return DomainParts(subdomain, domain, suffix)
+
+
+domain_extractor = DomainExtractor(maxsize=settings.DOMAINS_CACHE_SIZE)
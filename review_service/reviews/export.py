@@ -0,0 +1,20 @@
+from itertools import islice
+
+from .fastpath import ValuesSerializer
+
+CHUNK_SIZE = 2000
+
+
+def export_rows(queryset, values_serializer: ValuesSerializer, renderer, chunk_size=CHUNK_SIZE):
+    """
+    Yields rows of queryset rendered by NDJSONRenderer or CSVRenderer chunk by chunk.
+    Rows are read by QuerySet.iterator(), which uses a server-side cursor on PostgreSQL,
+    so neither the rows nor the output are ever kept in memory at once
+    """
+    rows = queryset.values(*values_serializer.columns).iterator(chunk_size=chunk_size)
+    lines = renderer.render_rows(values_serializer.iter_representation(rows), values_serializer.names)
+    while True:
+        chunk = b"".join(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
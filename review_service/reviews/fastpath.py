@@ -0,0 +1,121 @@
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .metrics import timed
+from .renderers import FastJSONRenderer
+
+# Fields, which represent a value of a row as it is
+PLAIN_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField)
+FLOAT_FIELDS = (serializers.FloatField, serializers.DecimalField)
+
+
+class ValuesSerializer:
+    """
+    Serializes rows of QuerySet.values() into the same dicts the passed ModelSerializer makes of instances.
+    A converter of every field is picked once, so rows are converted without model instances
+    and without field-by-field serialization. Raises ValueError for fields it can't convert
+    """
+
+    def __init__(self, serializer: serializers.ModelSerializer):
+        self.fields = []
+        self.has_floats = False
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            self.fields.append((name, *self.get_column_and_converter(field)))
+            self.has_floats = self.has_floats or isinstance(field, FLOAT_FIELDS)
+
+    @property
+    def columns(self):
+        return [column for name, column, converter in self.fields]
+
+    @property
+    def names(self):
+        return [name for name, column, converter in self.fields]
+
+    def iter_representation(self, rows):
+        """Lazy to_representation() for rows of QuerySet.iterator()"""
+        fields = self.fields
+        for row in rows:
+            yield {name: None if row[column] is None else convert(row[column]) for name, column, convert in fields}
+
+    def to_representation(self, rows):
+        fields = self.fields
+        with timed("serialize"):
+            return [
+                {name: None if row[column] is None else convert(row[column]) for name, column, convert in fields}
+                for row in rows
+            ]
+
+    @classmethod
+    def get_column_and_converter(cls, field):
+        """Returns column of values() the field is read from and a function, which represents its value"""
+        if "." in field.source or field.source == "*":
+            raise ValueError(f"Field {field.field_name} isn't a column")
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and not field.pk_field:
+            return f"{field.source}_id", cls.plain
+        if isinstance(field, PLAIN_FIELDS):
+            return field.source, cls.plain if isinstance(field, serializers.CharField) else field.to_representation
+        if isinstance(field, serializers.DateTimeField):
+            return field.source, cls.get_datetime_converter(field)
+        if isinstance(field, (serializers.ModelField, serializers.ReadOnlyField)):
+            raise ValueError(f"Field {field.field_name} has no known representation")
+        if isinstance(field, (serializers.Serializer, serializers.ListSerializer, serializers.SerializerMethodField)):
+            raise ValueError(f"Field {field.field_name} needs an instance")
+        return field.source, field.to_representation
+
+    @staticmethod
+    def plain(value):
+        return value
+
+    @staticmethod
+    def get_datetime_converter(field: serializers.DateTimeField):
+        """Returns fast ISO 8601 converter, the same as DateTimeField.to_representation does"""
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        field_timezone = getattr(field, "timezone", field.default_timezone())
+        if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if timezone.is_naive(value):
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+
+        return convert
+
+
+class FastListMixin:
+    """
+    Lists reviews in JSON through ValuesSerializer and FastJSONRenderer with the same output as
+    the regular way, which is still used for other formats and serializers ValuesSerializer can't handle
+    """
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return super().list(request, *args, **kwargs)
+        try:
+            values_serializer = ValuesSerializer(self.get_serializer())
+        except ValueError:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # Ordering columns and annotations, e.g. search_rank, stay in rows, because pagination
+        # takes cursor positions from them, even if sparse fields left them out
+        ordering_columns = self.get_ordering_columns(queryset) if hasattr(self, "get_ordering_columns") else []
+        rows = queryset.values(
+            *dict.fromkeys([*values_serializer.columns, *ordering_columns]), *queryset.query.annotations
+        )
+        page = self.paginate_queryset(rows)
+        if page is None:
+            response = Response(values_serializer.to_representation(rows))
+        else:
+            response = self.get_paginated_response(values_serializer.to_representation(page))
+
+        if not values_serializer.has_floats:
+            request.accepted_renderer = FastJSONRenderer()
+        return response
@@ -1,4 +1,8 @@
+import zlib
+
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils.functional import cached_property
 
 
 class IntegerRangeField(models.IntegerField):
@@ -7,7 +11,74 @@ class IntegerRangeField(models.IntegerField):
         self.min_value, self.max_value = min_value, max_value
         models.IntegerField.__init__(self, verbose_name, name, **kwargs)
 
+    @cached_property
+    def validators(self):
+        """Adds min_value and max_value validators, so they are checked not only in forms"""
+        validators = super().validators
+        if self.min_value is not None:
+            validators.append(MinValueValidator(self.min_value))
+        if self.max_value is not None:
+            validators.append(MaxValueValidator(self.max_value))
+        return validators
+
     def formfield(self, **kwargs):
         defaults = {'min_value': self.min_value, 'max_value': self.max_value}
         defaults.update(kwargs)
         return super(IntegerRangeField, self).formfield(**defaults)
+
+
+class CompressedTextField(models.TextField):
+    """
+    Text, which is kept in a binary column and compressed by zlib, when its UTF-8 encoding is at least
+    threshold bytes long. The first byte of a stored value tells whether the rest is raw or compressed,
+    so short texts cost nothing to read. Forms and serializers see a regular TextField
+    """
+    RAW, ZLIB = b"\x00", b"\x01"
+
+    def __init__(self, *args, threshold=256, level=6, **kwargs):
+        self.threshold, self.level = threshold, level
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.threshold != 256:
+            kwargs["threshold"] = self.threshold
+        if self.level != 6:
+            kwargs["level"] = self.level
+        return name, path, args, kwargs
+
+    def get_internal_type(self):
+        return "BinaryField"
+
+    def from_db_value(self, value, expression, connection):
+        return self.decompress(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return self.decompress(value)
+        return super().to_python(value)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        return None if value is None else self.compress(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        return None if value is None else connection.Database.Binary(value)
+
+    def compress(self, text: str):
+        data = text.encode()
+        if len(data) >= self.threshold:
+            compressed = zlib.compress(data, self.level)
+            # Texts, which don't get smaller, are kept raw
+            if len(compressed) < len(data):
+                return self.ZLIB + compressed
+        return self.RAW + data
+
+    @classmethod
+    def decompress(cls, value):
+        if value is None:
+            return None
+        value = bytes(value)
+        data = zlib.decompress(value[1:]) if value[:1] == cls.ZLIB else value[1:]
+        return data.decode()
@@ -1,21 +1,67 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Greatest, Length
 from django_filters import rest_framework as filters
 
-from .models import Shop, Review
+from .models import Shop, Review, SEARCH_CONFIG
 
 
 class ReviewsFilter(filters.FilterSet):
-    """Filters reviews by author_email, requires exact similarity"""
+    """
+    Filters reviews by author_email, requires exact similarity, and by shop's id.
+    q finds reviews by words of their title and content
+    """
     author = filters.CharFilter(field_name="author_email", lookup_expr="exact")
+    shop = filters.NumberFilter(field_name="shop_id", lookup_expr="exact")
+    q = filters.CharFilter(method="search_reviews")
 
     class Meta:
         model = Review
         fields = []
 
+    @staticmethod
+    def search_reviews(queryset, name, value):
+        """
+        Matches stored search_vector in PostgreSQL and annotates reviews with search_rank,
+        which ReviewViewSet orders them by. Other databases fall back to a non-case-sensitive containing
+        in title and excerpt, because content is compressed
+        """
+        if connections[queryset.db].vendor == "postgresql":
+            query = SearchQuery(value, config=SEARCH_CONFIG, search_type="websearch")
+            # ts_rank() is real, which isn't equal to its own value parsed back from a cursor,
+            # so it's cast to double precision, which round-trips through str() exactly
+            rank = Cast(SearchRank(F("search_vector"), query), FloatField())
+            return queryset.filter(search_vector=query).annotate(search_rank=rank)
+
+        return queryset.filter(Q(title__icontains=value) | Q(excerpt__icontains=value))
+
 
 class ShopsFilter(filters.FilterSet):
-    """Filters shops by domain_name, requires passed name to a non-case-sensitive containing"""
+    """
+    Filters shops by domain_name, requires passed name to a non-case-sensitive containing.
+    Search finds shops with a similar domain_name or name and orders them from the most similar
+    """
     name = filters.CharFilter(field_name="domain_name", lookup_expr="icontains")
+    search = filters.CharFilter(method="search_shops")
 
     class Meta:
         model = Shop
         fields = []
+
+    @staticmethod
+    def search_shops(queryset, name, value):
+        """
+        Ranks shops by trigram similarity in PostgreSQL, where every condition is served by trigram indexes.
+        Other databases fall back to a non-case-sensitive containing, shorter domain names go first
+        """
+        if connections[queryset.db].vendor == "postgresql":
+            return queryset.filter(
+                Q(domain_name__trigram_similar=value) | Q(name__trigram_similar=value) | Q(domain_name__icontains=value)
+            ).annotate(
+                similarity=Greatest(TrigramSimilarity("domain_name", value), TrigramSimilarity("name", value))
+            ).order_by("-similarity", "id")
+
+        return queryset.filter(
+            Q(domain_name__icontains=value) | Q(name__icontains=value)
+        ).order_by(Length("domain_name"), "id")
@@ -0,0 +1,91 @@
+from functools import partial
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+
+from .models import Review, check_changes_lag
+from .serializers import BulkReviewSerializer
+from .shops import shop_resolver
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+class IngestReport:
+    """Counts created and failed rows of a bulk upload, keeps errors of the first MAX_REPORTED_ERRORS rows"""
+
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row: int, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+    @property
+    def data(self):
+        return {
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def ingest_reviews(rows, chunk_size=CHUNK_SIZE):
+    """
+    Validates and creates reviews from any iterable of rows chunk by chunk,
+    so only one chunk is kept in memory. Returns IngestReport
+    """
+    report = IngestReport()
+    rows = enumerate(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        ingest_chunk(chunk, report)
+
+    return report
+
+
+def ingest_chunk(chunk, report: IngestReport):
+    """Validates a chunk of (row number, row), resolves all its shop links at once and creates reviews"""
+    numbers, rows = [], []
+    for number, row in chunk:
+        if isinstance(row, ParseError):
+            report.add_error(number, [row.detail])
+        else:
+            numbers.append(number)
+            rows.append(row)
+
+    serializer = BulkReviewSerializer(data=rows, many=True)
+    serializer.is_valid()
+    for index, errors in serializer.item_errors.items():
+        report.add_error(numbers[index], errors)
+
+    valid_rows = [row for row in serializer.validated_data if row is not None]
+    if not valid_rows:
+        return
+
+    # Shops are resolved before the transaction, so rolled back shops never get into resolver's cache
+    reviews = shop_resolver.write_with_shops(
+        partial(create_reviews, valid_rows), (row["shop_link"] for row in valid_rows)
+    )
+    report.created += len(reviews)
+
+
+def create_reviews(rows, shop_pks: dict):
+    """Creates reviews of validated rows with shops of their links by one bulk insert, returns them"""
+    reviews = []
+    for row in rows:
+        fields = {name: value for name, value in row.items() if name != "shop_link"}
+        reviews.append(Review(shop_id=shop_pks[row["shop_link"]], **fields))
+    with transaction.atomic():
+        started = timezone.now()
+        Review.objects.bulk_create(reviews, batch_size=len(reviews))
+        check_changes_lag(started)
+    return reviews
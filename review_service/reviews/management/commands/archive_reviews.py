@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reviews.models import Review
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves reviews created earlier than the archive age to the archive from the oldest, batch by batch. "
+        "Every batch is moved in its own transaction, so an interrupted run is resumed by running it again"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.REVIEW_ARCHIVE_AFTER_DAYS, help="Age of reviews in days to archive"
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Amount of reviews moved per transaction")
+
+    def handle(self, *args, **options):
+        old_reviews = Review.objects.filter(
+            date_created__lt=timezone.now() - timedelta(days=options["days"])
+        ).order_by("date_created", "id")
+        archived = 0
+        while True:
+            pks = list(old_reviews.values_list("pk", flat=True)[:options["batch_size"]])
+            if not pks:
+                break
+            archived += Review.objects.filter(pk__in=pks).bulk_archive()
+            self.stdout.write(f"Archived {archived} reviews")
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} reviews"))
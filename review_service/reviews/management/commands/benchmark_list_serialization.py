@@ -0,0 +1,73 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from reviews.fastpath import ValuesSerializer
+from reviews.models import Review, Shop
+from reviews.renderers import FastJSONRenderer
+from reviews.serializers import ReviewSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares serialization of a review list with ReviewSerializer and JSONRenderer "
+        "against ValuesSerializer and FastJSONRenderer. Reviews are created in a transaction, "
+        "which is rolled back in the end"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reviews", type=int, default=500, help="Amount of reviews in the list")
+        parser.add_argument("--repeat", type=int, default=20, help="Amount of timed runs of each way")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_reviews(options["reviews"])
+            results = {
+                "reviews": options["reviews"],
+                "model_serializer": self.measure(self.serialize_instances, options["repeat"]),
+                "values_serializer": self.measure(self.serialize_values, options["repeat"]),
+            }
+            if self.serialize_instances() != self.serialize_values():
+                raise AssertionError("Outputs of both ways differ")
+            transaction.set_rollback(True)
+
+        results["speedup"] = round(results["model_serializer"]["best_ms"] / results["values_serializer"]["best_ms"], 2)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def create_reviews(amount):
+        shop = Shop.objects.create(name="Benchmark", domain_name="benchmark-list-shop", link="https://benchmark.com/")
+        Review.objects.bulk_create(
+            Review(
+                title=f"Review #{number}",
+                content="Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 10,
+                shop=shop,
+                stars=number % 5 + 1,
+                author_email=f"user{number}@email.com"
+            )
+            for number in range(amount)
+        )
+
+    @staticmethod
+    def serialize_instances():
+        reviews = Review.objects.order_by("-date_created", "-id")
+        return JSONRenderer().render(ReviewSerializer(reviews, many=True).data)
+
+    @staticmethod
+    def serialize_values():
+        values_serializer = ValuesSerializer(ReviewSerializer())
+        rows = Review.objects.order_by("-date_created", "-id").values(*values_serializer.columns)
+        return FastJSONRenderer().render(values_serializer.to_representation(rows))
+
+    @staticmethod
+    def measure(serialize, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serialize()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return {"best_ms": round(timings[0], 3), "median_ms": round(timings[len(timings) // 2], 3)}
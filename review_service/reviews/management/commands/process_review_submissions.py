@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.submissions import process_submissions
+
+
+class Command(BaseCommand):
+    help = "Creates reviews of queued submissions in batches, polls the queue until it is stopped"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Amount of submissions created per bulk insert")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait on an empty queue")
+        parser.add_argument("--once", action="store_true", help="Processes the queue once and exits")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_submissions(options["batch_size"])
+            if processed:
+                self.stdout.write(f"Processed {processed} submissions")
+            if options["once"]:
+                return
+            time.sleep(options["poll_interval"])
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reviews.models import ReviewDeletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes tombstones of reviews deleted earlier than the retention period, "
+        "consumers of the change feed, which haven't synced for longer, have to resync all reviews"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.REVIEW_DELETIONS_RETENTION_DAYS, help="Days tombstones are kept"
+        )
+
+    def handle(self, *args, **options):
+        deleted, _ = ReviewDeletion.objects.filter(
+            date_deleted__lt=timezone.now() - timedelta(days=options["days"])
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from reviews.ratings import rebuild_daily_stats, rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculates reviews count, stars sum, rating and stars histogram of every shop "
+        "and daily stats of shops from reviews"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Amount of shops updated per query")
+
+    def handle(self, *args, **options):
+        shops_amount = rebuild_ratings(batch_size=options["batch_size"])
+        days_amount = rebuild_daily_stats(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt ratings of {shops_amount} shops and {days_amount} daily stats"))
@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from reviews.benchmarks import run_benchmarks
+from reviews.models import Shop
+from reviews.seeding import seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a scratch test database and measures latency percentiles, throughput and SQL queries "
+        "of every endpoint in-process, prints a JSON report"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shops", type=int, default=100, help="Amount of seeded shops")
+        parser.add_argument("--reviews-per-shop", type=int, default=100, help="Average amount of reviews of a shop")
+        parser.add_argument("--skew", type=float, default=1.0, help="Zipf's exponent of the seeded data")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of random generator")
+        parser.add_argument("--requests", type=int, default=200, help="Amount of measured requests per scenario")
+        parser.add_argument("--warmup", type=int, default=10, help="Amount of unmeasured requests per scenario")
+        parser.add_argument("--scenario", action="append", dest="scenarios", help="Runs only passed scenarios")
+        parser.add_argument("--warm-cache", action="store_true", help="Keeps the result cache between requests")
+        parser.add_argument("--keepdb", action="store_true", help="Keeps and reuses the seeded scratch database")
+        parser.add_argument("--output", help="Writes the report to the file instead of stdout")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            # Only the primary is replaced by the scratch database, replicas would serve real data to safe requests
+            with override_settings(REPLICA_DATABASES=[]):
+                if not Shop.objects.exists():
+                    seed(options["shops"], options["reviews_per_shop"], options["skew"], options["seed"])
+                report = run_benchmarks(
+                    options["requests"], options["warmup"], options["scenarios"], options["warm_cache"]
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(report, file, indent=2)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from reviews.seeding import is_test_database, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk creates shops and reviews spread over them and their authors by Zipf's law, "
+        "only in a test database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shops", type=int, default=100, help="Amount of created shops")
+        parser.add_argument("--reviews-per-shop", type=int, default=100, help="Average amount of reviews of a shop")
+        parser.add_argument("--skew", type=float, default=1.0, help="Zipf's exponent, 0 spreads reviews evenly")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of random generator")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Amount of rows created per query")
+
+    def handle(self, *args, **options):
+        if not is_test_database(connection):
+            raise CommandError(f"Refusing to seed {connection.settings_dict['NAME']}, it isn't a test database.")
+        shops_amount, reviews_amount = seed(
+            options["shops"], options["reviews_per_shop"], options["skew"], options["seed"], options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {reviews_amount} reviews of {shops_amount} shops"))
@@ -0,0 +1,220 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Metrics of the current sampled request, None outside of them
+_current = ContextVar("request_metrics", default=None)
+
+
+class Histogram:
+    """Prometheus histogram with a series of buckets, sum and count per labels"""
+
+    def __init__(self, name: str, description: str, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self.series.get(labels, (None, 0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self.series[labels] = (counts, total + value)
+
+    def render(self, label_names):
+        """Returns lines of Prometheus text format, bucket counts are cumulative"""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self.series.items())
+        for labels, counts, total in series:
+            label_pairs = ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_pairs},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_pairs}}} {total}")
+            lines.append(f"{self.name}_count{{{label_pairs}}} {cumulative}")
+        return lines
+
+
+def escape_label(value: str):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Histograms of requests by route, method and status, which are kept in memory of the process"""
+    label_names = ("route", "method", "status")
+
+    def __init__(self):
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "Time spent on a request.", DURATION_BUCKETS
+        )
+        self.sql_duration = Histogram(
+            "http_request_sql_duration_seconds", "Time spent on SQL queries of a sampled request.", DURATION_BUCKETS
+        )
+        self.view_duration = Histogram(
+            "http_request_view_duration_seconds", "Time spent in the view of a sampled request.", DURATION_BUCKETS
+        )
+        self.render_duration = Histogram(
+            "http_request_render_duration_seconds", "Time spent on rendering a sampled response.", DURATION_BUCKETS
+        )
+        self.serialize_duration = Histogram(
+            "http_request_serialize_duration_seconds", "Time spent on serializing data of a sampled request.",
+            DURATION_BUCKETS
+        )
+        self.queries = Histogram(
+            "http_request_sql_queries", "Amount of SQL queries of a sampled request.", QUERIES_BUCKETS
+        )
+
+    @property
+    def histograms(self):
+        return [
+            self.request_duration, self.sql_duration, self.view_duration, self.render_duration,
+            self.serialize_duration, self.queries,
+        ]
+
+    def render(self):
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render(self.label_names))
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Timings of one sampled request, SQL queries are counted by an execute wrapper of every connection"""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_duration = 0.0
+        self.view_started = None
+        self.render_started = None
+        self.render_duration = 0.0
+        self.spans = {}
+        self.open_spans = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_duration += time.perf_counter() - started
+            self.queries += 1
+
+    def add_span(self, name: str, duration: float):
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Adds time spent in the block to Server-Timing of the current request, if it is sampled.
+    Blocks inside of a block of the same span, e.g. nested serializers, aren't counted twice
+    """
+    metrics = _current.get()
+    if metrics is None or name in metrics.open_spans:
+        yield
+        return
+    metrics.open_spans.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_span(name, time.perf_counter() - started)
+        metrics.open_spans.discard(name)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures duration of every request and, for a METRICS_SAMPLE_RATE share of requests,
+    amount and duration of SQL queries, time of the view, of serializing and of rendering. They are sent in
+    Server-Timing header and observed by per-route histograms of registry
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            response = self.get_response(request)
+            registry.request_duration.observe(self.get_labels(request, response), time.perf_counter() - started)
+            return response
+
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        duration = time.perf_counter() - started
+        view_duration = (metrics.render_started or started + duration) - (metrics.view_started or started)
+        labels = self.get_labels(request, response)
+        registry.request_duration.observe(labels, duration)
+        registry.sql_duration.observe(labels, metrics.sql_duration)
+        registry.view_duration.observe(labels, view_duration)
+        registry.render_duration.observe(labels, metrics.render_duration)
+        registry.serialize_duration.observe(labels, metrics.spans.get("serialize", 0.0))
+        registry.queries.observe(labels, metrics.queries)
+
+        timings = [
+            ("sql", metrics.sql_duration, f"{metrics.queries} queries"),
+            ("view", view_duration, None),
+            ("render", metrics.render_duration, None),
+            *((name, span, None) for name, span in metrics.spans.items()),
+            ("total", duration, None),
+        ]
+        response["Server-Timing"] = ", ".join(
+            f'{name};dur={value * 1000:.2f}' + (f';desc="{description}"' if description else "")
+            for name, value, description in timings
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, "metrics"):
+            request.metrics.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        """DRF responses are rendered after the view and every middleware's process_template_response"""
+        if hasattr(request, "metrics"):
+            metrics = request.metrics
+            metrics.render_started = time.perf_counter()
+
+            def finish_rendering(rendered_response):
+                metrics.render_duration = time.perf_counter() - metrics.render_started
+
+            response.add_post_render_callback(finish_rendering)
+        return response
+
+    @staticmethod
+    def get_labels(request, response):
+        """Route is the matched URL pattern, so ids in paths don't make new series"""
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match is not None else "unmatched"
+        return route, request.method, str(response.status_code)
+
+
+def metrics_view(request):
+    """Exposes histograms of registry in Prometheus text format"""
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,69 @@
+# Generated by Django 3.2.5 on 2026-10-18 18:56
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    Shop = apps.get_model('reviews', 'Shop')
+    Review = apps.get_model('reviews', 'Review')
+
+    histogram = {f'stars_{stars}': Count('id', filter=Q(stars=stars)) for stars in range(1, 6)}
+    rows = Review.objects.values('shop_id').annotate(
+        reviews_count=Count('id'), stars_sum=Sum('stars'), **histogram
+    ).order_by()
+    for row in rows:
+        shop_id = row.pop('shop_id')
+        row['rating'] = row['stars_sum'] / row['reviews_count']
+        Shop.objects.filter(pk=shop_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_alter_review_stars'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='rating',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='reviews_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='stars_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='stars_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='stars_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='stars_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='stars_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='stars_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
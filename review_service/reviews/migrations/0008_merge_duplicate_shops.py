@@ -0,0 +1,36 @@
+# Generated by Django 3.2.5 on 2026-10-18 18:58
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_shops(apps, schema_editor):
+    """Moves reviews of shops with the same domain_name to the oldest of them and deletes the rest"""
+    Shop = apps.get_model('reviews', 'Shop')
+    Review = apps.get_model('reviews', 'Review')
+    counters = ['reviews_count', 'stars_sum', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5']
+
+    duplicates = Shop.objects.values('domain_name').annotate(
+        shops_amount=Count('id'), kept_id=Min('id')
+    ).filter(shops_amount__gt=1).order_by()
+    for duplicate in duplicates:
+        shops = Shop.objects.filter(domain_name=duplicate['domain_name'])
+        kept = shops.get(pk=duplicate['kept_id'])
+        for shop in shops.exclude(pk=kept.pk):
+            for counter in counters:
+                setattr(kept, counter, getattr(kept, counter) + getattr(shop, counter))
+            Review.objects.filter(shop_id=shop.pk).update(shop_id=kept.pk)
+            shop.delete()
+        kept.rating = kept.stars_sum / kept.reviews_count if kept.reviews_count else None
+        kept.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_review_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_shops, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.5 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_merge_duplicate_shops'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shop',
+            name='domain_name',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.5 on 2026-10-18 19:01
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+TRIGRAM_INDEXES = [
+    django.contrib.postgres.indexes.GinIndex(fields=['domain_name'], name='shop_domain_name_trgm_idx', opclasses=['gin_trgm_ops']),
+    django.contrib.postgres.indexes.GinIndex(fields=['name'], name='shop_name_trgm_idx', opclasses=['gin_trgm_ops']),
+]
+
+# icontains is compiled to UPPER(domain_name::text) LIKE UPPER(...) in PostgreSQL,
+# such expression index can't be declared in Meta.indexes in Django 3.2
+UPPER_DOMAIN_NAME_INDEX = 'shop_domain_name_upper_trgm_idx'
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Shop = apps.get_model('reviews', 'Shop')
+    for index in TRIGRAM_INDEXES:
+        schema_editor.add_index(Shop, index)
+    schema_editor.execute(
+        'CREATE INDEX %s ON %s USING gin ((UPPER(%s::text)) gin_trgm_ops)' % (
+            schema_editor.quote_name(UPPER_DOMAIN_NAME_INDEX),
+            schema_editor.quote_name(Shop._meta.db_table),
+            schema_editor.quote_name('domain_name'),
+        )
+    )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Shop = apps.get_model('reviews', 'Shop')
+    for index in TRIGRAM_INDEXES:
+        schema_editor.remove_index(Shop, index)
+    schema_editor.execute('DROP INDEX IF EXISTS %s' % schema_editor.quote_name(UPPER_DOMAIN_NAME_INDEX))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_shop_unique_domain_name'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='shop', index=index) for index in TRIGRAM_INDEXES
+            ],
+        ),
+    ]
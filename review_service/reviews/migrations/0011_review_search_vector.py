@@ -0,0 +1,67 @@
+# Generated by Django 3.2.5 on 2026-10-18 19:03
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='review_search_vector_idx')
+
+CREATE_TRIGGER = """
+CREATE FUNCTION reviews_review_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER reviews_review_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, content ON reviews_review
+    FOR EACH ROW EXECUTE PROCEDURE reviews_review_search_vector_update();
+
+UPDATE reviews_review SET title = title;
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS reviews_review_search_vector_trigger ON reviews_review;
+DROP FUNCTION IF EXISTS reviews_review_search_vector_update();
+"""
+
+
+def create_search_vector_trigger(apps, schema_editor):
+    """Fills search_vector of existing reviews and keeps it up to date on every write, bulk ones included"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_TRIGGER)
+    schema_editor.add_index(apps.get_model('reviews', 'Review'), SEARCH_VECTOR_INDEX)
+
+
+def drop_search_vector_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('reviews', 'Review'), SEARCH_VECTOR_INDEX)
+    schema_editor.execute(DROP_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_shop_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_search_vector_trigger, drop_search_vector_trigger),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='review', index=SEARCH_VECTOR_INDEX),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.5 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_review_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='date_updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['date_updated', 'id'], name='review_updated_idx'),
+        ),
+    ]
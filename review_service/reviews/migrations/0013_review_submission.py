@@ -0,0 +1,32 @@
+# Generated by Django 3.2.5 on 2026-10-18 19:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_conditional_get_validators'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSubmission',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('processing', 'Processing'), ('created', 'Created'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('errors', models.JSONField(blank=True, null=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_claimed', models.DateTimeField(blank=True, null=True)),
+                ('date_processed', models.DateTimeField(blank=True, null=True)),
+                ('review', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reviews.review')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reviewsubmission',
+            index=models.Index(fields=['status', 'date_created'], name='submission_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.5 on 2026-10-18 19:18
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def fill_daily_stats(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    ShopDailyStats = apps.get_model('reviews', 'ShopDailyStats')
+
+    histogram = {f'stars_{stars}': Count('id', filter=Q(stars=stars)) for stars in range(1, 6)}
+    rows = Review.objects.annotate(day=TruncDate('date_created')).values('shop_id', 'day').annotate(
+        reviews_count=Count('id'), stars_sum=Sum('stars'), **histogram
+    ).order_by()
+    ShopDailyStats.objects.bulk_create((ShopDailyStats(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0013_review_submission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('reviews_count', models.PositiveIntegerField(default=0)),
+                ('stars_sum', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='reviews.shop')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='shopdailystats',
+            constraint=models.UniqueConstraint(fields=('shop', 'day'), name='shop_daily_stats_unique'),
+        ),
+        migrations.RunPython(fill_daily_stats, migrations.RunPython.noop),
+    ]
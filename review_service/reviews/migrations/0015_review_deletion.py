@@ -0,0 +1,25 @@
+# Generated by Django 3.2.5 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0014_shop_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_id', models.BigIntegerField()),
+                ('date_deleted', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reviewdeletion',
+            index=models.Index(fields=['date_deleted', 'id'], name='review_deletion_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.5 on 2026-10-18 22:10
+
+from django.db import migrations, models
+import reviews.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0015_review_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=300),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='content_compressed',
+            field=reviews.fields.CompressedTextField(null=True),
+        ),
+    ]
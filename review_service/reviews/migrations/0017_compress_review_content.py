@@ -0,0 +1,80 @@
+# Generated by Django 3.2.5 on 2026-10-18 22:10
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+EXCERPT_LENGTH = 300
+
+CREATE_TRIGGER = """
+CREATE FUNCTION reviews_review_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER reviews_review_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, content ON reviews_review
+    FOR EACH ROW EXECUTE PROCEDURE reviews_review_search_vector_update();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS reviews_review_search_vector_trigger ON reviews_review;
+DROP FUNCTION IF EXISTS reviews_review_search_vector_update();
+"""
+
+
+def make_excerpt(content):
+    if len(content) <= EXCERPT_LENGTH:
+        return content
+    cut = content[:EXCERPT_LENGTH - 1]
+    words = cut.rsplit(None, 1)
+    if len(words) == 2:
+        cut = words[0]
+    return cut.rstrip() + "…"
+
+
+def copy_content(apps, schema_editor, source, target, fill_excerpt):
+    """Copies content between columns batch by batch in pk order, so reviews are never loaded all at once"""
+    Review = apps.get_model('reviews', 'Review')
+    reviews = Review.objects.using(schema_editor.connection.alias)
+    last_pk = 0
+    while True:
+        batch = list(reviews.filter(pk__gt=last_pk).order_by('pk').only('pk', source)[:BATCH_SIZE])
+        if not batch:
+            return
+        for review in batch:
+            setattr(review, target, getattr(review, source))
+            if fill_excerpt:
+                review.excerpt = make_excerpt(review.content)
+        reviews.bulk_update(batch, [target, 'excerpt'] if fill_excerpt else [target])
+        last_pk = batch[-1].pk
+
+
+def compress_content(apps, schema_editor):
+    """
+    Compresses content of existing reviews and fills their excerpts. search_vector is kept, it is made
+    by the application from now on, because PostgreSQL can't read compressed content in a trigger
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TRIGGER)
+    copy_content(apps, schema_editor, 'content', 'content_compressed', fill_excerpt=True)
+
+
+def decompress_content(apps, schema_editor):
+    copy_content(apps, schema_editor, 'content_compressed', 'content', fill_excerpt=False)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0016_review_compressed_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(compress_content, decompress_content),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.5 on 2026-10-18 22:10
+
+from django.db import migrations, models
+import reviews.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0017_compress_review_content'),
+    ]
+
+    operations = [
+        # The default lets the column be added back with existing rows, when the migration is reversed
+        migrations.AlterField(
+            model_name='review',
+            name='content',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='review',
+            name='content',
+        ),
+        migrations.RenameField(
+            model_name='review',
+            old_name='content_compressed',
+            new_name='content',
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='content',
+            field=reviews.fields.CompressedTextField(),
+        ),
+    ]
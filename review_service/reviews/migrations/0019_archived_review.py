@@ -0,0 +1,39 @@
+# Generated by Django 3.2.5 on 2026-10-18 19:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+import reviews.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0018_review_content_compressed'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reviewsubmission',
+            name='review',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reviews.review'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedReview',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=155)),
+                ('content', reviews.fields.CompressedTextField()),
+                ('excerpt', models.CharField(blank=True, editable=False, max_length=300)),
+                ('stars', reviews.fields.IntegerRangeField()),
+                ('author_email', models.EmailField(max_length=254)),
+                ('date_created', models.DateTimeField()),
+                ('date_updated', models.DateTimeField()),
+                ('date_archived', models.DateTimeField()),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reviews', to='reviews.shop')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedreview',
+            index=models.Index(fields=['shop', '-date_created', '-id'], name='archived_review_shop_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.5 on 2026-10-18 23:30
+
+from django.db import migrations
+
+# name__icontains of ShopAdmin search and of autocomplete of ReviewAdmin is compiled to
+# UPPER(name::text) LIKE UPPER(...) in PostgreSQL, like domain_name's one in 0010
+UPPER_NAME_INDEX = 'shop_name_upper_trgm_idx'
+
+
+def create_upper_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Shop = apps.get_model('reviews', 'Shop')
+    schema_editor.execute(
+        'CREATE INDEX %s ON %s USING gin ((UPPER(%s::text)) gin_trgm_ops)' % (
+            schema_editor.quote_name(UPPER_NAME_INDEX),
+            schema_editor.quote_name(Shop._meta.db_table),
+            schema_editor.quote_name('name'),
+        )
+    )
+
+
+def drop_upper_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS %s' % schema_editor.quote_name(UPPER_NAME_INDEX))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0019_archived_review'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_upper_name_index, drop_upper_name_index),
+    ]
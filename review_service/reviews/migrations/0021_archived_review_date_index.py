@@ -0,0 +1,17 @@
+# Generated by Django 3.2.5 on 2026-10-18 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0020_shop_name_upper_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedreview',
+            index=models.Index(fields=['date_archived'], name='archived_review_date_idx'),
+        ),
+    ]
@@ -0,0 +1,190 @@
+import hashlib
+from calendar import timegm
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .cache import result_cache
+from .routers import PrimaryStickinessMiddleware, track_replica_reads
+
+
+class ConditionalGetMixin:
+    """
+    Answers GET requests with 304 Not Modified, when If-None-Match or If-Modified-Since matches,
+    before the main query is made and anything is serialized.
+    Validators are made of get_list_validators() for a list, by default the latest date_updated
+    and amount of rows, and of the object's own date_updated for a detail
+    """
+    last_modified_field = "date_updated"
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        last_modified, *validators = self.get_list_validators(queryset)
+        last_modified = latest(last_modified, self.get_embedded_last_modified())
+        return self.get_conditional_response(
+            request, last_modified, *validators
+        ) or self.with_validators(super().list(request, *args, **kwargs))
+
+    def get_list_validators(self, queryset):
+        """
+        Returns the latest date_updated of listed rows and other values, which change with the list.
+        Aggregates all listed rows, views of large tables should override it
+        """
+        validators = queryset.aggregate(last_modified=Max(self.last_modified_field), count=Count("pk"))
+        return validators["last_modified"], validators["count"]
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        last_modified = self.get_object_last_modified(kwargs[lookup_url_kwarg])
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)  # responds with 404 Not Found
+
+        return self.get_conditional_response(
+            request, latest(last_modified, self.get_embedded_last_modified())
+        ) or self.with_validators(super().retrieve(request, *args, **kwargs))
+
+    def get_object_last_modified(self, lookup_value):
+        """Returns date_updated of the object to retrieve, None if there is no such object"""
+        return self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: lookup_value}
+        ).values_list(self.last_modified_field, flat=True).first()
+
+    def get_embedded_last_modified(self):
+        """Latest date_updated of other rows embedded in responses, e.g. reviews of shops, None if there are none"""
+        return None
+
+    def get_conditional_response(self, request, last_modified, *validators):
+        """Returns 304 Not Modified or 412 Precondition Failed response, if request's conditions say so"""
+        self.validator_headers = self.get_validator_headers(request, last_modified, *validators)
+        return self.check_validator_headers(request, self.validator_headers)
+
+    @staticmethod
+    def check_validator_headers(request, headers: dict):
+        """Checks request's conditions against ETag and Last-Modified from headers"""
+        response = HttpResponse()
+        for header, value in headers.items():
+            response[header] = value
+        conditional_response = get_conditional_response(
+            request,
+            etag=headers["ETag"],
+            last_modified=parse_http_date_safe(headers.get("Last-Modified", "")),
+            response=response,
+        )
+        if conditional_response is not response:
+            return conditional_response
+
+    def with_validators(self, response):
+        if response.status_code == 200:
+            for header, value in self.validator_headers.items():
+                response[header] = value
+        return response
+
+    @staticmethod
+    def get_validator_headers(request, last_modified, *validators):
+        """
+        ETag depends on requested path with query params and accepted format, because they change
+        the response without changing the data
+        """
+        etag = hashlib.md5("|".join(map(str, [
+            request.get_full_path(), request.accepted_renderer.format, last_modified, *validators
+        ])).encode()).hexdigest()
+
+        headers = {"ETag": quote_etag(etag), "Vary": "Accept"}
+        if last_modified:
+            headers["Last-Modified"] = http_date(timegm(last_modified.utctimetuple()))
+        return headers
+
+
+def latest(*dates):
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
+
+
+class CachedResponseMixin:
+    """
+    Serves list and retrieve from result_cache, goes before ConditionalGetMixin,
+    so a cached response is checked against request's conditions without any query.
+    Views give namespaces of their entries with get_cache_namespaces().
+    Only results read from the primary are cached: a lagging replica could keep data before a write
+    under versions bumped by the write. Clients sticky to the primary after a write bypass the cache
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response("list", request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response("retrieve", request, *args, **kwargs)
+
+    def get_cached_response(self, action, request, *args, **kwargs):
+        if PrimaryStickinessMiddleware.is_sticky(request):
+            return getattr(super(), action)(request, *args, **kwargs)
+
+        params = dict(request.query_params.lists())
+        params.update({f"_{name}": [str(value)] for name, value in kwargs.items()})
+        params["_format"] = [request.accepted_renderer.format]
+        key = result_cache.make_key(
+            f"{type(self).__name__}.{action}", params, self.get_cache_namespaces(request, *args, **kwargs)
+        )
+
+        cached = result_cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            return self.check_validator_headers(request, headers) or Response(data, headers=headers)
+
+        with track_replica_reads() as replica_reads:
+            response = getattr(super(), action)(request, *args, **kwargs)
+        if response.status_code == 200 and not replica_reads:
+            result_cache.set(key, (response.data, self.validator_headers))
+        return response
+
+    def get_cache_namespaces(self, request, *args, **kwargs):
+        raise NotImplementedError("get_cache_namespaces() must be implemented")
+
+
+class DeferredColumnsMixin:
+    """
+    Reads only columns of fields, which are left in the serializer by "fields" and "exclude" query params
+    or by "default_exclude" of the serializer context, and columns of the ordering, which pagination takes
+    cursor positions from
+    """
+    sparse_fields_params = ("fields", "exclude")
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in SAFE_METHODS or not (
+            any(param in self.request.query_params for param in self.sparse_fields_params)
+            or self.get_serializer_context().get("default_exclude")
+        ):
+            return queryset
+
+        columns = self.get_serializer_columns(queryset.model, self.get_serializer())
+        if columns is None:
+            return queryset
+        return queryset.only(*dict.fromkeys([*columns, *self.get_ordering_columns(queryset)]))
+
+    @staticmethod
+    def get_serializer_columns(model, serializer):
+        """Returns model fields the serializer reads or None, if some of them aren't model fields"""
+        columns = []
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            try:
+                columns.append(model._meta.get_field(field.source).name)
+            except FieldDoesNotExist:
+                return None
+        return columns
+
+    def get_ordering_columns(self, queryset):
+        """Returns model fields of the ordering, annotations like search_rank aren't columns"""
+        if hasattr(self, "get_keyset_ordering"):
+            ordering = self.get_keyset_ordering(queryset)
+        else:
+            ordering = getattr(self, "ordering", None) or []
+        fields = [order.lstrip("-") for order in ordering]
+        return [field for field in fields if field not in queryset.query.annotations]
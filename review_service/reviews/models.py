@@ -1,25 +1,388 @@
-from django.db import models
+import uuid
+from datetime import timedelta
 
-from .fields import IntegerRangeField
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import DatabaseError, connections, models, router, transaction
+from django.db.models import F, Func, Value
+from django.db.models.expressions import RawSQL
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .fields import CompressedTextField, IntegerRangeField
+
+MIN_STARS, MAX_STARS = 1, 5
+
+# Text search configuration of Review.search_vector
+SEARCH_CONFIG = "english"
+# Length of Review.excerpt, which lists show instead of compressed content
+EXCERPT_LENGTH = 300
+
+# Sent with the list of created reviews by ReviewQuerySet.bulk_create(), which doesn't send post_save.
+# Like post_save, all bulk signals are sent with alias of the database as "using"
+reviews_bulk_created = Signal()
+# Sent by set-based ReviewQuerySet.bulk_delete(), bulk_modify() and bulk_archive() with values of affected rows
+# before them
+reviews_bulk_deleted = Signal()
+reviews_bulk_modified = Signal()
+reviews_bulk_archived = Signal()
+
+# Values of affected rows, which are sent with reviews_bulk_deleted and reviews_bulk_modified
+BULK_TRACKED_FIELDS = ("id", "shop_id", "stars", "author_email", "date_created")
+# Amount of pks in one DELETE or UPDATE of bulk_delete(), bulk_modify() and bulk_archive()
+BULK_CHUNK_SIZE = 500
 
 
 class Shop(models.Model):
     name = models.CharField(max_length=100)
-    domain_name = models.CharField(max_length=100)
+    domain_name = models.CharField(max_length=100, unique=True)
     link = models.URLField()
+    date_updated = models.DateTimeField(auto_now=True)
+
+    # Rating aggregates, kept in sync with reviews by reviews.ratings
+    reviews_count = models.PositiveIntegerField(default=0, db_index=True)
+    stars_sum = models.PositiveIntegerField(default=0)
+    rating = models.FloatField(null=True, blank=True, db_index=True)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Trigram indexes for ShopsFilter, they exist only in PostgreSQL (see migration 0010)
+            GinIndex(fields=["domain_name"], name="shop_domain_name_trgm_idx", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["name"], name="shop_name_trgm_idx", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def stars_field(stars: int):
+        """Returns name of the histogram field, which counts reviews with passed amount of stars"""
+        return f"stars_{stars}"
+
+
+class LatestReviewsQuerySet(models.QuerySet):
+    """Queries shared by reviews and archived reviews"""
+
+    def latest_of_shops(self, shop_ids, limit: int):
+        """
+        Returns the latest limit reviews of every passed shop, ordered by shop, in one query. PostgreSQL reads
+        them by a LATERAL index range scan of limit rows per shop, other databases rank reviews by ROW_NUMBER()
+        """
+        shop_ids = list(shop_ids)
+        if not shop_ids:
+            return self.none()
+
+        table = self.model._meta.db_table
+        if connections[self.db].vendor == "postgresql":
+            sql = (
+                f'SELECT latest.id FROM unnest(%s::bigint[]) AS shop(id) CROSS JOIN LATERAL ('
+                f'SELECT id FROM "{table}" WHERE shop_id = shop.id ORDER BY date_created DESC, id DESC LIMIT %s'
+                f') latest'
+            )
+            params = [shop_ids, limit]
+        else:
+            placeholders = ", ".join(["%s"] * len(shop_ids))
+            sql = (
+                f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+                f'PARTITION BY shop_id ORDER BY date_created DESC, id DESC) AS position '
+                f'FROM "{table}" WHERE shop_id IN ({placeholders})) ranked WHERE position <= %s'
+            )
+            params = [*shop_ids, limit]
+        return self.filter(pk__in=RawSQL(sql, params)).order_by("shop_id", "-date_created", "-id")
+
+
+class ReviewQuerySet(LatestReviewsQuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Creates reviews and sends reviews_bulk_created, so everything built on reviews is kept in sync"""
+        objs = list(objs)
+        for review in objs:
+            review.fill_derived_fields(self.db)
+        reviews = super().bulk_create(objs, *args, **kwargs)
+        reviews_bulk_created.send(sender=self.model, reviews=reviews, using=self.db)
+        return reviews
+
+    def bulk_delete(self):
+        """
+        Deletes matching reviews by pks without loading instances and sends reviews_bulk_deleted.
+        Rows are locked first, so the sent values are exactly the deleted ones. Returns amount of deleted reviews
+        """
+        with transaction.atomic(using=self.db):
+            rows = self.lock_tracked_rows()
+            pks = [row["id"] for row in rows]
+            deleted = 0
+            for start in range(0, len(pks), BULK_CHUNK_SIZE):
+                chunk = pks[start:start + BULK_CHUNK_SIZE]
+                # Nothing refers to reviews except submissions, so the cascade is done here and reviews are
+                # deleted by a raw DELETE, which QuerySet.delete() itself falls back to without signals
+                ReviewSubmission.objects.using(self.db).filter(review_id__in=chunk).update(review=None)
+                deleted += self.model.objects.using(self.db).filter(pk__in=chunk)._raw_delete(self.db)
+            reviews_bulk_deleted.send(sender=self.model, rows=rows, using=self.db)
+        return deleted
+
+    def bulk_modify(self, **values):
+        """
+        Updates matching reviews by pks with passed field values and date_updated, sends reviews_bulk_modified.
+        Unlike update() it keeps everything built on reviews in sync. Returns amount of updated reviews.
+        date_updated is taken after rows are locked, so waiting for locks doesn't age it
+        """
+        derived = self.get_derived_values(values)
+        with transaction.atomic(using=self.db):
+            rows = self.lock_tracked_rows()
+            values["date_updated"] = timezone.now()
+            pks = [row["id"] for row in rows]
+            updated = 0
+            for start in range(0, len(pks), BULK_CHUNK_SIZE):
+                updated += self.model.objects.using(self.db).filter(
+                    pk__in=pks[start:start + BULK_CHUNK_SIZE]
+                ).update(**values, **derived)
+            reviews_bulk_modified.send(sender=self.model, rows=rows, values=values, using=self.db)
+            check_changes_lag(values["date_updated"])
+        return updated
+
+    def bulk_archive(self):
+        """
+        Moves matching reviews to ArchivedReview by INSERT ... SELECT, so content isn't decompressed on the way,
+        and sends reviews_bulk_archived. Archived reviews are still counted by shop aggregates and daily stats,
+        so they aren't changed. Returns amount of archived reviews
+        """
+        ops = connections[self.db].ops
+        quote = ops.quote_name
+        columns = ", ".join(
+            quote(field.column) for field in self.model._meta.concrete_fields if field.name != "search_vector"
+        )
+        insert = (
+            f"INSERT INTO {quote(ArchivedReview._meta.db_table)} ({columns}, date_archived) "
+            f"SELECT {columns}, %s FROM {quote(self.model._meta.db_table)} WHERE id IN ({{}})"
+        )
+        with transaction.atomic(using=self.db):
+            rows = self.lock_tracked_rows()
+            pks = [row["id"] for row in rows]
+            date_archived = ops.adapt_datetimefield_value(timezone.now())
+            archived = 0
+            with connections[self.db].cursor() as cursor:
+                for start in range(0, len(pks), BULK_CHUNK_SIZE):
+                    chunk = pks[start:start + BULK_CHUNK_SIZE]
+                    cursor.execute(insert.format(", ".join(["%s"] * len(chunk))), [date_archived, *chunk])
+                    archived += self.model.objects.using(self.db).filter(pk__in=chunk)._raw_delete(self.db)
+            reviews_bulk_archived.send(sender=self.model, rows=rows, using=self.db)
+        return archived
+
+    def lock_tracked_rows(self):
+        return list(self.select_for_update().order_by("pk").values(*BULK_TRACKED_FIELDS))
+
+    def get_derived_values(self, values: dict):
+        """
+        Returns excerpt and search_vector for an update of title or content. Content isn't readable by SQL,
+        so the part of search_vector made of content is kept by its weight, if only title is changed
+        """
+        derived = {}
+        if "content" in values:
+            derived["excerpt"] = make_excerpt(values["content"])
+        if connections[self.db].vendor == "postgresql" and ("title" in values or "content" in values):
+            title = Value(values["title"], output_field=models.TextField()) if "title" in values else F("title")
+            if "content" in values:
+                content_vector = get_weighted_vector(Value(values["content"], output_field=models.TextField()), "B")
+            else:
+                content_vector = Func(F("search_vector"), template="ts_filter(%(expressions)s, '{b}')")
+            derived["search_vector"] = Func(
+                get_weighted_vector(title, "A"), content_vector, template="(%(expressions)s)", arg_joiner=" || ",
+                output_field=SearchVectorField()
+            )
+        return derived
+
+
+def check_changes_lag(date_updated):
+    """
+    Raises DatabaseError, so the transaction is rolled back, if its reviews dated by date_updated weren't written
+    within REVIEW_CHANGES_LAG. The change feed serves only older changes, so such reviews could be committed
+    behind cursors consumers already got and would never reach them. Call it at the end of the transaction
+    """
+    if timezone.now() - date_updated > timedelta(seconds=settings.REVIEW_CHANGES_LAG):
+        raise DatabaseError("Transaction took longer than REVIEW_CHANGES_LAG, it would be missed by the change feed.")
+
+
+class ReviewManager(models.Manager.from_queryset(ReviewQuerySet)):
+
+    def get_queryset(self):
+        """search_vector is needed only inside of search queries, so it is never loaded"""
+        return super().get_queryset().defer("search_vector")
+
 
 class Review(models.Model):
     title = models.CharField(max_length=155)
-    content = models.TextField()
+    content = CompressedTextField()
+    # Start of content, which is stored raw, so lists never decompress content
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
     shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="reviews")
-    stars = IntegerRangeField(min_value=1, max_value=5)
+    stars = IntegerRangeField(min_value=MIN_STARS, max_value=MAX_STARS)
     author_email = models.EmailField()
     date_created = models.DateTimeField(auto_now_add=True)
     date_updated = models.DateTimeField(auto_now=True)
+    # Weighted title and content, filled on every save of them in PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ReviewManager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the whole list, of a shop's reviews and of an author's reviews
+            models.Index(fields=["-date_created", "-id"], name="review_created_idx"),
+            models.Index(fields=["shop", "-date_created", "-id"], name="review_shop_created_idx"),
+            models.Index(fields=["author_email", "-date_created", "-id"], name="review_author_created_idx"),
+            # Latest date_updated of conditional GET and reviews after a cursor of the change feed
+            models.Index(fields=["date_updated", "id"], name="review_updated_idx"),
+            # Full-text search of ReviewsFilter, exists only in PostgreSQL (see migration 0011)
+            GinIndex(fields=["search_vector"], name="review_search_vector_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.title} for {self.shop.name}"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"title", "content"} & set(update_fields):
+            self.fill_derived_fields(kwargs.get("using") or router.db_for_write(type(self), instance=self))
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "excerpt", "search_vector"}
+        super().save(*args, **kwargs)
+        # search_vector holds an expression, which isn't a value, so it's deferred again
+        self.__dict__.pop("search_vector", None)
+
+    def fill_derived_fields(self, using: str):
+        """
+        Fills excerpt and search_vector from title and content. PostgreSQL can't read compressed content,
+        so search_vector is made of the values being saved instead of a trigger
+        """
+        self.excerpt = make_excerpt(self.content)
+        if connections[using].vendor == "postgresql":
+            self.search_vector = get_weighted_vector(
+                Value(self.title, output_field=models.TextField()), "A"
+            ) + get_weighted_vector(Value(self.content, output_field=models.TextField()), "B")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remembers loaded values, so changes of shop and stars can be tracked on save"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+def make_excerpt(content: str):
+    """Returns content cut to EXCERPT_LENGTH at a word boundary with an ellipsis"""
+    if len(content) <= EXCERPT_LENGTH:
+        return content
+    cut = content[:EXCERPT_LENGTH - 1]
+    words = cut.rsplit(None, 1)
+    if len(words) == 2:
+        cut = words[0]
+    return cut.rstrip() + "…"
+
+
+def get_weighted_vector(expression, weight: str):
+    return SearchVector(expression, weight=weight, config=SEARCH_CONFIG)
+
+
+class ArchivedReview(models.Model):
+    """
+    Old review moved out of Review by archive_reviews command with its pk, so Review and its indexes stay small.
+    It's still counted by shop aggregates and daily stats and is retrieved by its pk, but is never listed
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=155)
+    content = CompressedTextField()
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="archived_reviews")
+    stars = IntegerRangeField(min_value=MIN_STARS, max_value=MAX_STARS)
+    author_email = models.EmailField()
+    date_created = models.DateTimeField()
+    date_updated = models.DateTimeField()
+    date_archived = models.DateTimeField()
+
+    objects = LatestReviewsQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The latest reviews of shops, which have too few of them in Review
+            models.Index(fields=["shop", "-date_created", "-id"], name="archived_review_shop_idx"),
+            # The latest archival, which validators of lists of reviews depend on
+            models.Index(fields=["date_archived"], name="archived_review_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} for {self.shop.name}"
+
+
+class ReviewDeletion(models.Model):
+    """Tombstone of a deleted review, the change feed of reviews.changes serves them after changed reviews"""
+    review_id = models.BigIntegerField()
+    date_deleted = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Tombstones after a cursor of the change feed
+            models.Index(fields=["date_deleted", "id"], name="review_deletion_feed_idx"),
+        ]
+
+    def __str__(self):
+        return f"Review {self.review_id} deleted on {self.date_deleted}"
+
+
+class ShopDailyStats(models.Model):
+    """Reviews of a shop created on a day, kept in sync with reviews by reviews.ratings like shop aggregates"""
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="daily_stats")
+    day = models.DateField()
+    reviews_count = models.PositiveIntegerField(default=0)
+    stars_sum = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves stats of a shop over a range of days
+            models.UniqueConstraint(fields=["shop", "day"], name="shop_daily_stats_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.shop_id} on {self.day}"
+
+
+class ReviewSubmission(models.Model):
+    """Review accepted by the async create mode, reviews.submissions creates submitted reviews in batches"""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        PROCESSING = "processing"
+        CREATED = "created"
+        FAILED = "failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Validated review body with "shop_link"
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    # Without a constraint, so the review can be moved to ArchivedReview
+    review = models.ForeignKey(
+        Review, null=True, blank=True, on_delete=models.SET_NULL, related_name="+", db_constraint=False
+    )
+    errors = models.JSONField(null=True, blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_claimed = models.DateTimeField(null=True, blank=True)
+    date_processed = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker claims the oldest queued submissions
+            models.Index(fields=["status", "date_created"], name="submission_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"Submission {self.id} ({self.status})"
@@ -0,0 +1,123 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor, _reverse_ordering
+
+
+def keyset_filter(first: str, first_value, second: str, second_value, descending: bool = False):
+    """
+    Returns Q selecting rows placed after (first_value, second_value) in ordering by a unique pair of fields.
+    The redundant range on the first field lets db use it as an index bound
+    """
+    lookup = "lt" if descending else "gt"
+    return Q(**{f"{first}__{lookup}e": first_value}) & (
+        Q(**{f"{first}__{lookup}": first_value}) | Q(**{first: first_value, f"{second}__{lookup}": second_value})
+    )
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a unique pair of fields, e.g. ("-date_created", "-id").
+    Cursor keeps values of both fields, so a page is always fetched by an index range scan
+    without OFFSET and COUNT(*), however deep it is
+    """
+    ordering = ("-date_created", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, self.cursor.position
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.get_position_filter(queryset, ordering, current_position))
+
+        # One extra item shows if there is a page following on from this one
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_page = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_following_page
+        else:
+            self.has_next, self.has_previous = has_following_page, current_position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Keyset pagination can't follow an arbitrary ordering, so it uses its own one,
+        unless the view picks another unique pair of fields with get_keyset_ordering(queryset)
+        """
+        if hasattr(view, "get_keyset_ordering"):
+            return tuple(view.get_keyset_ordering(queryset))
+        return type(self).ordering
+
+    def get_position_filter(self, queryset, ordering, position):
+        """Returns Q selecting rows placed after position in passed ordering"""
+        (first, first_value), (second, second_value) = self.parse_position(queryset, position)
+        return keyset_filter(first, first_value, second, second_value, descending=ordering[0].startswith("-"))
+
+    def parse_position(self, queryset, position):
+        """
+        Splits position into (field, value) pairs, values are converted by model fields or by output fields
+        of annotations. Raises 404 Not Found on malformed cursor
+        """
+        fields = [order.lstrip("-") for order in self.ordering]
+        values = position.split("|")
+        if len(values) != len(fields):
+            raise NotFound(self.invalid_cursor_message)
+
+        pairs = []
+        for field, value in zip(fields, values):
+            try:
+                if field in queryset.query.annotations:
+                    value = queryset.query.annotations[field].output_field.to_python(value)
+                else:
+                    value = queryset.model._meta.get_field(field).to_python(value)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            pairs.append((field, value))
+        return pairs
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip("-")
+            value = instance[field_name] if isinstance(instance, dict) else getattr(instance, field_name)
+            values.append(value.isoformat() if hasattr(value, "isoformat") else str(value))
+        return "|".join(values)
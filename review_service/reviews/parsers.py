@@ -0,0 +1,53 @@
+import io
+import json
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Request body is too large."
+    default_code = "payload_too_large"
+
+
+class LimitedJSONParser(JSONParser):
+    """
+    Parses JSON of at most REVIEW_BULK_JSON_MAX_SIZE bytes, which is loaded into memory at once.
+    Larger bodies are rejected with 413 before they are parsed, they have to be streamed as NDJSON
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        limit = settings.REVIEW_BULK_JSON_MAX_SIZE
+        body = stream.read(limit + 1)
+        if len(body) > limit:
+            raise PayloadTooLarge(f"JSON body is limited to {limit} bytes, send larger imports as NDJSON.")
+        return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline delimited JSON lazily: returns a generator, which reads the stream line by line,
+    so a body of any size is never loaded into memory at once. A line, which isn't valid JSON,
+    is yielded as ParseError, so the rest of the lines can still be used
+    """
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        return self.parse_lines(stream, encoding)
+
+    @staticmethod
+    def parse_lines(stream, encoding):
+        if stream is None:
+            return
+        for line in iter(stream.readline, b""):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line.decode(encoding))
+            except ValueError as exc:
+                yield ParseError(f"NDJSON parse error - {exc}")
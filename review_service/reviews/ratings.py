@@ -0,0 +1,176 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, NullIf, Trunc, TruncDate
+from django.utils import timezone
+
+from .models import ArchivedReview, Shop, ShopDailyStats, Review, MIN_STARS, MAX_STARS
+
+STARS_RANGE = range(MIN_STARS, MAX_STARS + 1)
+
+
+class RatingDeltas:
+    """
+    Collects changes of shops rating aggregates and of their daily stats,
+    so they can be applied with one UPDATE per shop and per shop's day
+    """
+
+    def __init__(self):
+        self.shops = defaultdict(lambda: defaultdict(int))
+        self.days = defaultdict(lambda: defaultdict(int))
+
+    def add(self, shop_id, stars, amount=1, date_created=None):
+        """
+        Counts amount of reviews with passed stars for a shop and, if date_created is passed,
+        for its day. Negative amount removes them
+        """
+        if shop_id is None or stars is None:
+            return
+        changed = [self.shops[shop_id]]
+        if date_created is not None:
+            changed.append(self.days[shop_id, timezone.localdate(date_created)])
+        for changes in changed:
+            changes["reviews_count"] += amount
+            changes["stars_sum"] += stars * amount
+            if stars in STARS_RANGE:
+                changes[Shop.stars_field(stars)] += amount
+
+    def remove(self, shop_id, stars, amount=1, date_created=None):
+        self.add(shop_id, stars, -amount, date_created)
+
+    def apply(self):
+        """Updates aggregates of every changed shop and day, skips ones whose changes cancel each other"""
+        with transaction.atomic():
+            for shop_id, changes in sorted(self.shops.items()):
+                changes = {field: delta for field, delta in changes.items() if delta}
+                if not changes:
+                    continue
+                Shop.objects.filter(pk=shop_id).update(**get_update_kwargs(changes))
+            for (shop_id, day), changes in sorted(self.days.items()):
+                changes = {field: delta for field, delta in changes.items() if delta}
+                if changes:
+                    update_daily_stats(shop_id, day, changes)
+        self.shops.clear()
+        self.days.clear()
+
+
+def update_daily_stats(shop_id, day, changes: dict):
+    """
+    Shifts stats of the shop's day by changes, creates them for added reviews of a new day.
+    Removals from missing stats are skipped, e.g. when the shop with its stats is being deleted
+    """
+    stats = ShopDailyStats.objects.filter(shop_id=shop_id, day=day)
+    shifts = {field: F(field) + delta for field, delta in changes.items()}
+    if stats.update(**shifts) or changes.get("reviews_count", 0) <= 0:
+        return
+    try:
+        with transaction.atomic():
+            ShopDailyStats.objects.create(shop_id=shop_id, day=day, **changes)
+    except IntegrityError:  # created concurrently
+        stats.update(**shifts)
+
+
+def get_update_kwargs(changes: dict):
+    """Builds kwargs for QuerySet.update(), which shift aggregates by changes and recalculate rating"""
+    kwargs = {field: F(field) + delta for field, delta in changes.items()}
+    count = changes.get("reviews_count", 0)
+    total = changes.get("stars_sum", 0)
+    # All expressions of one UPDATE see values before the update, so rating uses shifted values explicitly
+    kwargs["rating"] = Cast(F("stars_sum") + Value(total), FloatField()) / NullIf(
+        F("reviews_count") + Value(count), Value(0)
+    )
+    kwargs["date_updated"] = timezone.now()
+    return kwargs
+
+
+def count_reviews(reviews):
+    """Returns RatingDeltas with passed (shop_id, stars, date_created) of reviews counted"""
+    deltas = RatingDeltas()
+    for shop_id, stars, date_created in reviews:
+        deltas.add(shop_id, stars, date_created=date_created)
+    return deltas
+
+
+def sum_stars_by(*group_by, **annotations):
+    """
+    Returns {values of group_by: reviews count, stars sum and histogram} of reviews and archived reviews,
+    which shop aggregates and daily stats count both
+    """
+    histogram = {
+        Shop.stars_field(stars): Count("id", filter=Q(stars=stars)) for stars in STARS_RANGE
+    }
+    totals = {}
+    for model in (Review, ArchivedReview):
+        rows = model.objects.annotate(**annotations).values(*group_by).annotate(
+            reviews_count=Count("id"), stars_sum=Sum("stars"), **histogram
+        ).order_by()
+        for row in rows.iterator():
+            key = tuple(row.pop(field) for field in group_by)
+            if key in totals:
+                totals[key] = {field: totals[key][field] + value for field, value in row.items()}
+            else:
+                totals[key] = row
+    return totals
+
+
+def rebuild_ratings(batch_size=1000):
+    """Recalculates aggregates of all shops from scratch, returns amount of shops"""
+    aggregates = {shop_id: row for (shop_id,), row in sum_stars_by("shop_id").items()}
+
+    fields = ["reviews_count", "stars_sum", *(Shop.stars_field(stars) for stars in STARS_RANGE)]
+
+    shops = []
+    now = timezone.now()
+    with transaction.atomic():
+        for shop in Shop.objects.select_for_update().only("pk").iterator():
+            shop.date_updated = now
+            values = aggregates.get(shop.pk, {})
+            for field in fields:
+                setattr(shop, field, values.get(field, 0))
+            if shop.reviews_count:
+                shop.rating = shop.stars_sum / shop.reviews_count
+            else:
+                shop.rating = None
+            shops.append(shop)
+        Shop.objects.bulk_update(shops, [*fields, "rating", "date_updated"], batch_size=batch_size)
+
+    return len(shops)
+
+
+def rebuild_daily_stats(batch_size=1000):
+    """Recalculates daily stats of all shops from scratch, returns amount of days with reviews"""
+    rows = sum_stars_by("shop_id", "day", day=TruncDate("date_created"))
+
+    with transaction.atomic():
+        ShopDailyStats.objects.all().delete()
+        stats = ShopDailyStats.objects.bulk_create(
+            (ShopDailyStats(shop_id=shop_id, day=day, **row) for (shop_id, day), row in rows.items()),
+            batch_size=batch_size
+        )
+
+    return len(stats)
+
+
+def get_shop_stats(shop_id, bucket: str = "day", date_from=None, date_to=None):
+    """
+    Sums daily stats of a shop by days, weeks (starting on Monday) or months within an optional range of days.
+    Reads only daily stats, returns dicts with period, aggregates and rating ordered by period
+    """
+    stats = ShopDailyStats.objects.filter(shop_id=shop_id)
+    if date_from is not None:
+        stats = stats.filter(day__gte=date_from)
+    if date_to is not None:
+        stats = stats.filter(day__lte=date_to)
+
+    fields = ["reviews_count", "stars_sum", *(Shop.stars_field(stars) for stars in STARS_RANGE)]
+    period = F("day") if bucket == "day" else Trunc("day", bucket, output_field=DateField())
+    rows = stats.annotate(period=period).values("period").annotate(
+        **{field: Sum(field) for field in fields}
+    ).order_by("period")
+
+    results = []
+    for row in rows:
+        row["rating"] = row["stars_sum"] / row["reviews_count"] if row["reviews_count"] else None
+        results.append(row)
+    return results
@@ -0,0 +1,80 @@
+import csv
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, JSONRenderer is used without it
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renders the same bytes as JSONRenderer with default settings, but with orjson.
+    orjson formats floats differently (1e16 instead of 1e+16), so the renderer is meant for data
+    without floats, e.g. rows made by ValuesSerializer.
+    Falls back to JSONRenderer without orjson, with indent or non-default JSON settings
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or not (self.compact and not self.ensure_ascii)
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default, option=orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except TypeError:  # e.g. non-string keys or too big integers
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # JSONRenderer always escapes \u2028 and \u2029, so JavaScript can parse the output
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renders a list of rows as newline delimited JSON, every row is rendered by FastJSONRenderer"""
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def __init__(self):
+        self.json_renderer = FastJSONRenderer()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return b"".join(self.render_rows(rows))
+
+    def render_rows(self, rows, fields=None):
+        for row in rows:
+            yield self.json_renderer.render(row) + b"\n"
+
+
+class CSVRenderer(BaseRenderer):
+    """Renders a list of rows as CSV with a header of field names"""
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows else []
+        return b"".join(self.render_rows(rows, fields))
+
+    def render_rows(self, rows, fields=None):
+        """Yields the header and every row as encoded lines, rows are dicts keyed by fields"""
+        writer = csv.writer(LineBuffer())
+        yield writer.writerow(fields).encode(self.charset)
+        for row in rows:
+            yield writer.writerow([row[field] for field in fields]).encode(self.charset)
+
+
+class LineBuffer:
+    """File-like object, which returns a written line instead of keeping it"""
+
+    def write(self, value):
+        return value
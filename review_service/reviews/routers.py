@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signing import BadSignature, Signer
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import ConnectionDoesNotExist, DatabaseError
+from rest_framework.permissions import SAFE_METHODS
+
+STICKY_HEADER = "X-Primary-Until"
+STICKY_SALT = "reviews.routers.primary-until"
+
+# Reads go to the primary, unless a request allows replicas, so commands and signals never read stale rows
+_use_primary = ContextVar("use_primary", default=True)
+# Aliases of replicas, which reads inside of track_replica_reads() went to
+_replica_reads = ContextVar("replica_reads", default=None)
+
+
+@contextmanager
+def use_replicas(allowed: bool = True):
+    """Lets reads inside the block go to replicas or, if allowed is False, pins them to the primary"""
+    token = _use_primary.set(not allowed)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+@contextmanager
+def track_replica_reads():
+    """Yields a list, which gets aliases of replicas reads inside the block go to"""
+    aliases = []
+    token = _replica_reads.set(aliases)
+    try:
+        yield aliases
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaHealth:
+    """
+    Remembers, which replicas could be connected to, for a check interval,
+    so a replica being down costs one failed connection per interval instead of one per request
+    """
+
+    def __init__(self, check_interval: int):
+        self.check_interval = check_interval
+        self.checks = {}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias: str):
+        now = time.monotonic()
+        with self._lock:
+            checked_at, healthy = self.checks.get(alias, (None, None))
+        if checked_at is None or now - checked_at >= self.check_interval:
+            healthy = self.check(alias)
+            with self._lock:
+                self.checks[alias] = (now, healthy)
+        return healthy
+
+    @staticmethod
+    def check(alias: str):
+        try:
+            connection = connections[alias]
+            connection.ensure_connection()
+            return connection.is_usable()
+        except (ConnectionDoesNotExist, DatabaseError):
+            return False
+
+
+replica_health = ReplicaHealth(check_interval=settings.REPLICA_HEALTH_CHECK_INTERVAL)
+
+
+class ReplicaRouter:
+    """
+    Sends writes to the primary and reads, which are allowed to use replicas, to a random healthy one.
+    Falls back to the primary, when there are no replicas or all of them are down
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_primary.get():
+            return DEFAULT_DB_ALIAS
+        replicas = [alias for alias in settings.REPLICA_DATABASES if replica_health.is_healthy(alias)]
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        alias = random.choice(replicas)
+        replica_reads = _replica_reads.get()
+        if replica_reads is not None:
+            replica_reads.append(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas have the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Lets reads of safe requests go to replicas. After a successful write, reads of the client stick
+    to the primary for REPLICA_STICKY_SECONDS, so it reads its own writes despite replication lag.
+    The signed deadline is sent in a cookie and in X-Primary-Until header, clients without cookies may send it back
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        allowed = request.method in SAFE_METHODS and not self.is_sticky(request)
+        with use_replicas(allowed):
+            response = self.get_response(request)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            primary_until = self.sign_deadline(int(time.time()) + settings.REPLICA_STICKY_SECONDS)
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, primary_until, max_age=settings.REPLICA_STICKY_SECONDS, httponly=True
+            )
+            response[STICKY_HEADER] = primary_until
+        return response
+
+    @staticmethod
+    def sign_deadline(primary_until: int):
+        return Signer(salt=STICKY_SALT).sign(str(primary_until))
+
+    @staticmethod
+    def is_sticky(request):
+        """
+        Only deadlines signed by the server and at most REPLICA_STICKY_SECONDS ahead count, so a client can't pin
+        its reads to the primary, past replicas and cached results, for longer than after its own write
+        """
+        value = request.headers.get(STICKY_HEADER) or request.COOKIES.get(settings.REPLICA_STICKY_COOKIE)
+        if value is None:
+            return False
+        try:
+            primary_until = float(Signer(salt=STICKY_SALT).unsign(value))
+        except (BadSignature, ValueError):
+            return False
+        now = time.time()
+        return now < primary_until <= now + settings.REPLICA_STICKY_SECONDS
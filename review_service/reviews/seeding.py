@@ -0,0 +1,83 @@
+import random
+from itertools import accumulate
+
+from django.db.backends.base.creation import TEST_DATABASE_PREFIX
+
+from .models import Review, Shop
+
+# Real reviews are mostly positive
+STARS_WEIGHTS = {1: 10, 2: 5, 3: 10, 4: 25, 5: 50}
+WORDS = (
+    "delivery fast slow price quality support order refund broken great awful package courier "
+    "phone laptop screen battery warranty recommend never again perfect cheap expensive store"
+).split()
+
+
+def zipf_cum_weights(amount: int, skew: float):
+    """Cumulative weights of amount items, where the n-th item is picked 1 / n ** skew as often as the first"""
+    return list(accumulate(1 / (rank ** skew) for rank in range(1, amount + 1)))
+
+
+def is_test_database(connection):
+    """Tells if connection is to a test database made by the test runner or by run_benchmarks command"""
+    name = str(connection.settings_dict["NAME"])
+    if connection.vendor == "sqlite" and connection.creation.is_in_memory_db(name):
+        return True
+    return name == connection.settings_dict["TEST"].get("NAME") or name.startswith(TEST_DATABASE_PREFIX)
+
+
+def author_email(number: int):
+    return f"author{number}@email.com"
+
+
+def seed(shops_amount: int, reviews_per_shop: int, skew: float = 1.0, random_seed: int = 0, batch_size: int = 1000):
+    """
+    Creates shops_amount shops and shops_amount * reviews_per_shop reviews by bulk inserts.
+    Reviews are spread over shops and authors by Zipf's law with passed skew (0 spreads them evenly),
+    so a few shops and authors have most of the reviews. Returns amounts of created shops and reviews
+    """
+    rng = random.Random(random_seed)
+    first_number = Shop.objects.count() + 1
+    shops = Shop.objects.bulk_create(
+        (
+            Shop(name=f"Shop {number}", domain_name=f"shop{number}", link=f"https://shop{number}.com/")
+            for number in range(first_number, first_number + shops_amount)
+        ),
+        batch_size=batch_size,
+        ignore_conflicts=True,  # shops of a previous seed are reused
+    )
+    domain_names = [shop.domain_name for shop in shops]
+    shop_ids = sorted(
+        shop_id
+        for start in range(0, len(domain_names), batch_size)
+        for shop_id in Shop.objects.filter(
+            domain_name__in=domain_names[start:start + batch_size]
+        ).values_list("id", flat=True)
+    )
+
+    reviews_amount = shops_amount * reviews_per_shop
+    authors_amount = max(reviews_amount // 10, 1)
+    shop_weights = zipf_cum_weights(len(shop_ids), skew)
+    author_weights = zipf_cum_weights(authors_amount, skew)
+    stars, stars_weights = list(STARS_WEIGHTS), list(accumulate(STARS_WEIGHTS.values()))
+
+    created = 0
+    while created < reviews_amount:
+        amount = min(batch_size, reviews_amount - created)
+        Review.objects.bulk_create([
+            Review(
+                title=" ".join(rng.choices(WORDS, k=rng.randint(2, 8))).capitalize(),
+                content=" ".join(rng.choices(WORDS, k=rng.randint(10, 300))),
+                shop_id=shop_id,
+                stars=star,
+                author_email=author_email(author),
+            )
+            for shop_id, star, author in zip(
+                rng.choices(shop_ids, cum_weights=shop_weights, k=amount),
+                rng.choices(stars, cum_weights=stars_weights, k=amount),
+                rng.choices(range(1, authors_amount + 1), cum_weights=author_weights, k=amount),
+            )
+        ])
+        created += amount
+
+    return len(shop_ids), created
@@ -1,18 +1,260 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 
-from .models import Review, Shop
+from .changes import decode_cursor
+from .fastpath import ValuesSerializer
+from .filters import ReviewsFilter
+from .metrics import timed
+from .models import MAX_STARS, MIN_STARS, ArchivedReview, Review, ReviewSubmission, Shop
+from .shops import shop_resolver
 
 
-class ShopSerializer(serializers.ModelSerializer):
+def get_query_param_list(request, name: str):
+    """Returns comma separated values of query param, e.g. ?fields=id,title"""
+    return [value.strip() for value in request.query_params.get(name, "").split(",") if value.strip()]
+
+
+class SparseFieldsMixin:
+    """
+    Leaves only fields listed in "fields" query param and drops ones listed in "exclude" from
+    representations of read requests. Without "fields" fields of "default_exclude" in the context are dropped too,
+    they are returned only when they are asked for. Raises 400 Bad Request on unknown fields
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS or not hasattr(request, "query_params"):
+            return
+
+        only = get_query_param_list(request, "fields")
+        exclude = get_query_param_list(request, "exclude")
+        unknown = [name for name in [*only, *exclude] if name not in self.fields]
+        if unknown:
+            raise serializers.ValidationError({"fields": [f"Unknown fields: {', '.join(unknown)}."]})
+
+        if not only:
+            exclude += self.context.get("default_exclude", [])
+        for name in list(self.fields):
+            if (only and name not in only) or name in exclude:
+                self.fields.pop(name)
+
+
+class TimedRepresentationMixin:
+    """Adds time of representing instances to "serialize" span of sampled requests"""
+
+    def to_representation(self, instance):
+        with timed("serialize"):
+            return super().to_representation(instance)
+
+
+class ShopSerializer(TimedRepresentationMixin, SparseFieldsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Shop
         fields = "__all__"
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedRepresentationMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    """Review is written with "shop_link", its shop is resolved by the link's domain"""
+    shop_link = serializers.URLField(write_only=True)
 
     class Meta:
         model = Review
-        fields = "__all__"
+        exclude = ["search_vector"]
+        read_only_fields = ["shop"]
+
+    def validate(self, attrs):
+        """Resolves shop_link after all fields are valid, so invalid bodies never create shops"""
+        if "shop_link" in attrs:
+            self._shop_link = attrs.pop("shop_link")
+            attrs["shop_id"] = shop_resolver.get_shop_pk(self._shop_link)
+        return attrs
+
+    def save(self, **kwargs):
+        instance, attempted = self.instance, False
+
+        def save_atomically():
+            nonlocal attempted
+            if attempted:
+                # A rolled back attempt leaves its values on the instance, so it's read again
+                self.instance = None if instance is None else Review.objects.get(pk=instance.pk)
+            attempted = True
+            with transaction.atomic():
+                return super(ReviewSerializer, self).save(**kwargs)
+
+        return self.write_with_shop(save_atomically)
+
+    def write_with_shop(self, write):
+        """
+        Calls atomic write of validated_data and returns its result. If the shop of shop_link was deleted by another
+        process, write is called once more with the link resolved again (see ShopResolver.write_with_shops())
+        """
+        shop_link = getattr(self, "_shop_link", None)
+        if shop_link is None:
+            return write()
+
+        def write_with_shop_pks(shop_pks):
+            self.validated_data["shop_id"] = shop_pks[shop_link]
+            return write()
+
+        return shop_resolver.write_with_shops(write_with_shop_pks, [shop_link])
+
+
+class PartialListSerializer(serializers.ListSerializer):
+    """
+    Validates every item on its own and, unlike ListSerializer, keeps valid items when others are invalid.
+    Invalid items are None in validated_data, their errors are in item_errors by item's index
+    """
+
+    def to_internal_value(self, data):
+        self.item_errors = {}
+        validated_items = []
+        for index, item in enumerate(data):
+            try:
+                validated_items.append(self.child.run_validation(item))
+            except serializers.ValidationError as exc:
+                validated_items.append(None)
+                self.item_errors[index] = exc.detail
+
+        return validated_items
+
+
+def get_recent_reviews(shops):
+    """
+    Returns {shop pk: representations of its latest reviews} for passed shops, reviews are read by one query.
+    Shops, which count more reviews than Review has, get the rest from ArchivedReview by one more query.
+    Reviews are represented like in the list, by their excerpts without content
+    """
+    serializer = ReviewSerializer()
+    serializer.fields.pop("content")
+    values_serializer = ValuesSerializer(serializer)
+    columns = dict.fromkeys([*values_serializer.columns, "shop_id", "date_created"])
+    limit = settings.SHOP_RECENT_REVIEWS
+    shops = list(shops)
+
+    rows = {}
+    for row in Review.objects.latest_of_shops([shop.pk for shop in shops], limit).values(*columns):
+        rows.setdefault(row["shop_id"], []).append(row)
+    archived_shop_ids = [
+        shop.pk for shop in shops if len(rows.get(shop.pk, [])) < min(limit, shop.reviews_count)
+    ]
+    if archived_shop_ids:
+        for row in ArchivedReview.objects.latest_of_shops(archived_shop_ids, limit).values(*columns):
+            rows.setdefault(row["shop_id"], []).append(row)
+
+    return {
+        shop_id: values_serializer.to_representation(
+            sorted(shop_rows, key=lambda row: (row["date_created"], row["id"]), reverse=True)[:limit]
+        )
+        for shop_id, shop_rows in rows.items()
+    }
+
+
+class RecentReviewsListSerializer(serializers.ListSerializer):
+    """Reads the latest reviews of all listed shops at once, before shops are represented"""
+
+    def to_representation(self, data):
+        shops = list(data.all() if hasattr(data, "all") else data)
+        self.context["recent_reviews"] = get_recent_reviews(shops)
+        return super().to_representation(shops)
+
+
+class ShopDetailSerializer(ShopSerializer):
+    """Shop with its rating summary and its latest reviews from the newest"""
+    rating_summary = serializers.SerializerMethodField()
+    recent_reviews = serializers.SerializerMethodField()
+
+    class Meta(ShopSerializer.Meta):
+        list_serializer_class = RecentReviewsListSerializer
+
+    @staticmethod
+    def get_rating_summary(shop: Shop):
+        return {
+            "rating": shop.rating,
+            "reviews_count": shop.reviews_count,
+            "stars": {str(stars): getattr(shop, Shop.stars_field(stars)) for stars in range(MIN_STARS, MAX_STARS + 1)},
+        }
+
+    def get_recent_reviews(self, shop: Shop):
+        recent_reviews = self.context.get("recent_reviews")
+        if recent_reviews is None:
+            recent_reviews = get_recent_reviews([shop])
+        return recent_reviews.get(shop.pk, [])
+
+
+class BulkReviewSerializer(ReviewSerializer):
+    """Validates reviews of a bulk upload, shops are resolved from shop_link for all reviews at once"""
+
+    class Meta(ReviewSerializer.Meta):
+        list_serializer_class = PartialListSerializer
+
+    def validate(self, attrs):
+        """Keeps shop_link, it's resolved later together with links of other reviews"""
+        return attrs
+
+
+class ReviewSubmissionSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ReviewSubmission
+        fields = ["id", "status", "review", "errors", "date_created", "date_processed"]
+
+
+class ShopStatsQuerySerializer(serializers.Serializer):
+    """Validates query params of shop stats"""
+    bucket = serializers.ChoiceField(choices=["day", "week", "month"], default="day")
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if "date_from" in attrs and "date_to" in attrs and attrs["date_from"] > attrs["date_to"]:
+            raise serializers.ValidationError({"date_to": ["Must not be earlier than date_from."]})
+        return attrs
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    """Validates query params of the change feed, cursor is decoded into ChangesCursor"""
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+
+    def validate_cursor(self, value):
+        try:
+            return decode_cursor(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+
+class BatchQuerySerializer(serializers.Serializer):
+    """Validates comma separated ids of batch read, e.g. ?reviews=1,2&shops=3"""
+    reviews = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=200)
+    shops = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=200)
+
+    def to_internal_value(self, data):
+        return super().to_internal_value({
+            name: get_query_param_list(self.context["request"], name) for name in self.fields if name in data
+        })
+
+    def validate(self, attrs):
+        if not any(attrs.values()):
+            raise serializers.ValidationError("Pass ids of reviews or shops.")
+        return attrs
+
+
+class ReviewSelectionSerializer(serializers.Serializer):
+    """Selects reviews of bulk moderation by ids and by params of ReviewsFilter, e.g. {"author": ..., "shop": 1}"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=10000)
+    filter = serializers.DictField(child=serializers.CharField(), required=False, allow_empty=False)
+
+    def validate_filter(self, value):
+        unknown = sorted(set(value) - set(ReviewsFilter.base_filters))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown filters: {', '.join(unknown)}.")
+        return value
 
+    def validate(self, attrs):
+        if not attrs.get("ids") and not attrs.get("filter"):
+            raise serializers.ValidationError("Pass ids or filter, all reviews can't be moderated at once.")
+        return attrs
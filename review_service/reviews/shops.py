@@ -0,0 +1,164 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router
+
+from .domains import domain_extractor
+from .metrics import timed
+from .models import Shop
+
+
+def extract_domain(link: str):
+    """Returns domain name of link without subdomains and public suffix, e.g. "rozetka" of https://rozetka.com.ua/"""
+    with timed("domain"):
+        return domain_extractor.extract(link).domain
+
+
+class ShopResolver:
+    """
+    Resolves shop links to pks of shops, creates a shop if there is no shop with link's domain yet.
+    Resolved links and domains are kept in a bounded LRU, so repeated links don't hit db at all
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_shop_pk(self, link: str):
+        """Returns pk of the shop the link belongs to"""
+        shop_pk = self._get(("link", link))
+        if shop_pk is not None:
+            return shop_pk
+
+        domain_name = extract_domain(link)
+        shop_pk = self._get(("domain", domain_name))
+        if shop_pk is None:
+            shop_pk = self.get_or_create_shop(domain_name, link)
+            self._set(("domain", domain_name), shop_pk)
+        self._set(("link", link), shop_pk)
+
+        return shop_pk
+
+    def get_shop_pks(self, links):
+        """Returns {link: shop pk} for passed links, all uncached domains are resolved at once"""
+        shop_pks, domain_links = {}, {}
+        for link in dict.fromkeys(links):
+            shop_pk = self._get(("link", link))
+            if shop_pk is None:
+                domain_name = extract_domain(link)
+                shop_pk = self._get(("domain", domain_name))
+            if shop_pk is None:
+                domain_links.setdefault(domain_name, []).append(link)
+            else:
+                shop_pks[link] = shop_pk
+                self._set(("link", link), shop_pk)
+
+        if domain_links:
+            first_links = {domain_name: links[0] for domain_name, links in domain_links.items()}
+            for domain_name, shop_pk in self.get_or_create_shops(first_links).items():
+                self._set(("domain", domain_name), shop_pk)
+                for link in domain_links[domain_name]:
+                    shop_pks[link] = shop_pk
+                    self._set(("link", link), shop_pk)
+
+        return shop_pks
+
+    @staticmethod
+    def get_or_create_shops(domain_links: dict):
+        """
+        Gets or creates shops for passed {domain_name: link} with at most three queries,
+        shops created concurrently are skipped by the INSERT and fetched afterwards
+        """
+        shop_pks = dict(Shop.objects.filter(domain_name__in=domain_links).values_list("domain_name", "pk"))
+        missing = [domain_name for domain_name in domain_links if domain_name not in shop_pks]
+        if missing:
+            Shop.objects.bulk_create(
+                [
+                    Shop(name=domain_name.capitalize(), domain_name=domain_name, link=domain_links[domain_name])
+                    for domain_name in missing
+                ],
+                ignore_conflicts=True
+            )
+            shop_pks.update(Shop.objects.filter(domain_name__in=missing).values_list("domain_name", "pk"))
+
+        return shop_pks
+
+    @staticmethod
+    def get_or_create_shop(domain_name: str, link: str):
+        """
+        Returns pk of the shop with passed domain_name, creates it with the link if there is none. PostgreSQL does
+        it by one INSERT ... ON CONFLICT, whose no-op update makes RETURNING give pk of an existing or concurrently
+        created shop. Other databases fall back to get_or_create()
+        """
+        shop = Shop(name=domain_name.capitalize(), domain_name=domain_name, link=link)
+        connection = connections[router.db_for_write(Shop)]
+        if connection.vendor != "postgresql":
+            return Shop.objects.get_or_create(
+                domain_name=domain_name, defaults={"name": shop.name, "link": link}
+            )[0].pk
+
+        quote = connection.ops.quote_name
+        fields = [field for field in Shop._meta.concrete_fields if not field.primary_key]
+        domain_column = quote(Shop._meta.get_field("domain_name").column)
+        sql = (
+            f"INSERT INTO {quote(Shop._meta.db_table)} ({', '.join(quote(field.column) for field in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+            f"ON CONFLICT ({domain_column}) DO UPDATE SET {domain_column} = EXCLUDED.{domain_column} "
+            f"RETURNING {quote(Shop._meta.pk.column)}"
+        )
+        params = [field.get_db_prep_save(field.pre_save(shop, add=True), connection) for field in fields]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()[0]
+
+    def write_with_shops(self, write, links):
+        """
+        Calls write with {link: shop pk} of passed links and returns its result. A shop deleted by another process
+        may still be remembered by this one, then the atomic write fails on the foreign key. Such shops are
+        forgotten and write is called once more with links resolved again
+        """
+        links = list(links)
+        shop_pks = self.get_shop_pks(links)
+        try:
+            return write(shop_pks)
+        except IntegrityError:
+            if not self.forget_deleted(shop_pks.values()):
+                raise
+        return write(self.get_shop_pks(links))
+
+    def forget_deleted(self, shop_pks):
+        """Forgets shops with passed pks, which don't exist anymore, returns whether there were any"""
+        shop_pks = set(shop_pks)
+        existing = Shop.objects.using(router.db_for_write(Shop)).filter(pk__in=shop_pks).values_list("pk", flat=True)
+        deleted = shop_pks.difference(existing)
+        for shop_pk in deleted:
+            self.invalidate(shop_pk)
+        return bool(deleted)
+
+    def invalidate(self, shop_pk=None):
+        """Forgets links and domains of the shop with passed pk, forgets everything if pk isn't passed"""
+        with self._lock:
+            if shop_pk is None:
+                self._cache.clear()
+                return
+            for key in [key for key, value in self._cache.items() if value == shop_pk]:
+                del self._cache[key]
+
+    def _get(self, key):
+        with self._lock:
+            shop_pk = self._cache.get(key)
+            if shop_pk is not None:
+                self._cache.move_to_end(key)
+            return shop_pk
+
+    def _set(self, key, shop_pk):
+        with self._lock:
+            self._cache[key] = shop_pk
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+
+shop_resolver = ShopResolver(maxsize=settings.SHOP_LINKS_CACHE_SIZE)
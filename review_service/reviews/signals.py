@@ -0,0 +1,181 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import result_cache, review_namespace, reviews_namespace, SHOPS_NAMESPACE
+from .models import (
+    Review, ReviewDeletion, Shop,
+    reviews_bulk_archived, reviews_bulk_created, reviews_bulk_deleted, reviews_bulk_modified,
+)
+from .ratings import RatingDeltas, count_reviews
+from .shops import shop_resolver
+
+# Review's fields, whose values before saving are needed to keep things built on reviews in sync
+TRACKED_FIELDS = ("shop_id", "stars", "author_email")
+
+
+@receiver(pre_save, sender=Review)
+def remember_values_before_save(sender, instance, **kwargs):
+    """Remembers tracked values the review had before saving, loads them if instance wasn't loaded from db"""
+    if instance.pk is None:
+        instance._values_before = None
+    elif hasattr(instance, "_loaded_values"):
+        instance._values_before = get_loaded_values(instance)
+    else:
+        instance._values_before = Review.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+
+
+@receiver(post_save, sender=Review)
+def update_shop_rating_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Moves review's stars from shop aggregates and daily stats it had before saving to current ones,
+    fixtures are skipped, because they bring shops with their aggregates
+    """
+    if raw:
+        return
+    deltas = RatingDeltas()
+    values_before = getattr(instance, "_values_before", None)
+    if not created and values_before is not None:
+        deltas.remove(values_before["shop_id"], values_before["stars"], date_created=instance.date_created)
+    deltas.add(instance.shop_id, instance.stars, date_created=instance.date_created)
+    deltas.apply()
+
+
+@receiver(post_save, sender=Review)
+def invalidate_results_on_save(sender, instance, **kwargs):
+    """Invalidates lists the review was or is in, its detail and shops, whose rating it changes"""
+    authors = {instance.author_email}
+    values_before = getattr(instance, "_values_before", None)
+    if values_before is not None:
+        authors.add(values_before["author_email"])
+    result_cache.invalidate(
+        reviews_namespace(), *map(reviews_namespace, authors), review_namespace(instance.pk), SHOPS_NAMESPACE
+    )
+
+
+@receiver(post_save, sender=Review)
+def remember_saved_values(sender, instance, **kwargs):
+    """Saved values become loaded ones, so the next saving of the instance compares with them"""
+    loaded = getattr(instance, "_loaded_values", {})
+    loaded.update({field: getattr(instance, field) for field in TRACKED_FIELDS})
+    instance._loaded_values = loaded
+
+
+@receiver(post_delete, sender=Review)
+def update_shop_rating_on_delete(sender, instance, **kwargs):
+    """Removes deleted review's stars from shop aggregates and daily stats"""
+    values = get_loaded_values(instance)
+    deltas = RatingDeltas()
+    deltas.remove(values["shop_id"], values["stars"], date_created=instance.date_created)
+    deltas.apply()
+
+
+@receiver(post_delete, sender=Review)
+def invalidate_results_on_delete(sender, instance, **kwargs):
+    values = get_loaded_values(instance)
+    result_cache.invalidate(
+        reviews_namespace(), reviews_namespace(values["author_email"]), review_namespace(instance.pk), SHOPS_NAMESPACE
+    )
+
+
+@receiver(post_delete, sender=Review)
+def record_deletion_on_delete(sender, instance, **kwargs):
+    """Leaves a tombstone of the review for the change feed, in the transaction of the deletion"""
+    ReviewDeletion.objects.create(review_id=instance.pk)
+
+
+@receiver(reviews_bulk_created, sender=Review)
+def update_shop_rating_on_bulk_create(sender, reviews, **kwargs):
+    """Adds stars of all created reviews to shop aggregates and daily stats with one UPDATE per shop and day"""
+    count_reviews((review.shop_id, review.stars, review.date_created) for review in reviews).apply()
+
+
+@receiver(reviews_bulk_created, sender=Review)
+def invalidate_results_on_bulk_create(sender, reviews, using, **kwargs):
+    authors = {review.author_email for review in reviews}
+    invalidate_on_commit(using, reviews_namespace(), *map(reviews_namespace, authors), SHOPS_NAMESPACE)
+
+
+@receiver(reviews_bulk_deleted, sender=Review)
+def update_shop_rating_on_bulk_delete(sender, rows, **kwargs):
+    """Removes stars of all deleted reviews from shop aggregates and daily stats"""
+    deltas = RatingDeltas()
+    for row in rows:
+        deltas.remove(row["shop_id"], row["stars"], date_created=row["date_created"])
+    deltas.apply()
+
+
+@receiver(reviews_bulk_deleted, sender=Review)
+def invalidate_results_on_bulk_delete(sender, rows, using, **kwargs):
+    authors = {row["author_email"] for row in rows}
+    invalidate_on_commit(
+        using, reviews_namespace(), *map(reviews_namespace, authors),
+        *(review_namespace(row["id"]) for row in rows), SHOPS_NAMESPACE
+    )
+
+
+@receiver(reviews_bulk_deleted, sender=Review)
+def record_deletions_on_bulk_delete(sender, rows, **kwargs):
+    ReviewDeletion.objects.bulk_create([ReviewDeletion(review_id=row["id"]) for row in rows], batch_size=1000)
+
+
+@receiver(reviews_bulk_modified, sender=Review)
+def update_shop_rating_on_bulk_modify(sender, rows, values, **kwargs):
+    """Moves stars of all updated reviews, if their stars or shops are changed"""
+    if "stars" not in values and "shop_id" not in values:
+        return
+    deltas = RatingDeltas()
+    for row in rows:
+        deltas.remove(row["shop_id"], row["stars"], date_created=row["date_created"])
+        deltas.add(
+            values.get("shop_id", row["shop_id"]), values.get("stars", row["stars"]), date_created=row["date_created"]
+        )
+    deltas.apply()
+
+
+@receiver(reviews_bulk_modified, sender=Review)
+def invalidate_results_on_bulk_modify(sender, rows, values, using, **kwargs):
+    authors = {row["author_email"] for row in rows}
+    if "author_email" in values:
+        authors.add(values["author_email"])
+    invalidate_on_commit(
+        using, reviews_namespace(), *map(reviews_namespace, authors),
+        *(review_namespace(row["id"]) for row in rows), SHOPS_NAMESPACE
+    )
+
+
+@receiver(reviews_bulk_archived, sender=Review)
+def invalidate_results_on_bulk_archive(sender, rows, using, **kwargs):
+    """
+    Archived reviews leave lists, their details are the same from the archive. Shop aggregates aren't changed,
+    because they still count archived reviews, shops are invalidated only for their latest reviews
+    """
+    authors = {row["author_email"] for row in rows}
+    invalidate_on_commit(using, reviews_namespace(), *map(reviews_namespace, authors), SHOPS_NAMESPACE)
+
+
+def invalidate_on_commit(using: str, *namespaces):
+    """
+    Invalidates namespaces once the transaction of a bulk write is committed. Otherwise a read between
+    the invalidation and the commit would cache rows from before the write under the new versions
+    """
+    transaction.on_commit(lambda: result_cache.invalidate(*namespaces), using=using)
+
+
+def get_loaded_values(instance: Review):
+    """Returns tracked values the review has in db, falls back to current values"""
+    loaded = getattr(instance, "_loaded_values", {})
+    return {field: loaded[field] if field in loaded else getattr(instance, field) for field in TRACKED_FIELDS}
+
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def forget_resolved_shop(sender, instance, **kwargs):
+    """Drops cached links of a changed or deleted shop, so they are resolved again"""
+    shop_resolver.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def invalidate_results_on_shop_change(sender, instance, **kwargs):
+    result_cache.invalidate(SHOPS_NAMESPACE)
@@ -0,0 +1,152 @@
+import logging
+import threading
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Review, ReviewSubmission, check_changes_lag
+from .shops import shop_resolver
+
+logger = logging.getLogger(__name__)
+
+# Submissions claimed longer ago are considered abandoned by a crashed worker and are claimed again
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+Status = ReviewSubmission.Status
+
+
+def submit_review(payload: dict):
+    """Queues validated review body with "shop_link", returns ReviewSubmission to track it"""
+    submission = ReviewSubmission.objects.create(payload=payload)
+    if settings.REVIEW_SUBMISSIONS_WORKER_THREAD:
+        SubmissionWorker.ensure_started()
+    return submission
+
+
+def process_submissions(batch_size: int = None):
+    """Processes queued submissions batch by batch until the queue is empty, returns amount of processed ones"""
+    processed = 0
+    while True:
+        amount = process_batch(batch_size)
+        if not amount:
+            return processed
+        processed += amount
+
+
+def process_batch(batch_size: int = None):
+    """
+    Claims a batch of the oldest queued submissions, resolves shops of all of them at once and creates
+    their reviews with one bulk insert. Returns amount of processed submissions
+    """
+    submissions = claim_batch(batch_size or settings.REVIEW_SUBMISSIONS_BATCH_SIZE)
+    if not submissions:
+        return 0
+
+    # Shops are resolved before the transaction, so rolled back shops never get into resolver's cache.
+    # Any error, e.g. of a malformed payload, makes submissions be processed one by one, so a single
+    # bad submission fails alone instead of leaving the whole batch claimed again and again
+    try:
+        links = [submission.payload["shop_link"] for submission in submissions]
+        shop_resolver.write_with_shops(partial(create_batch, submissions), links)
+    except Exception:
+        logger.exception("Bulk insert of %s submitted reviews failed, they are created one by one", len(submissions))
+        for submission in submissions:
+            process_one(submission)
+
+    return len(submissions)
+
+
+def create_batch(submissions, shop_pks: dict):
+    """Creates reviews of submissions by one bulk insert and marks submissions as created in one transaction"""
+    reviews = [make_review(submission, shop_pks) for submission in submissions]
+    with transaction.atomic():
+        started = timezone.now()
+        Review.objects.bulk_create(reviews, batch_size=len(reviews))
+        finish(submissions, reviews)
+        check_changes_lag(started)
+
+
+def claim_batch(batch_size: int):
+    """Marks a batch of queued or abandoned submissions as processing, concurrent workers skip locked rows"""
+    now = timezone.now()
+    with transaction.atomic():
+        submissions = list(ReviewSubmission.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Status.QUEUED) | Q(status=Status.PROCESSING, date_claimed__lt=now - CLAIM_TIMEOUT)
+        ).order_by("date_created")[:batch_size])
+        ReviewSubmission.objects.filter(pk__in=[submission.pk for submission in submissions]).update(
+            status=Status.PROCESSING, date_claimed=now
+        )
+    return submissions
+
+
+def make_review(submission: ReviewSubmission, shop_pks: dict):
+    fields = {name: value for name, value in submission.payload.items() if name != "shop_link"}
+    return Review(shop_id=shop_pks[submission.payload["shop_link"]], **fields)
+
+
+def process_one(submission: ReviewSubmission):
+    """Creates the review of a submission on its own, any error marks the submission as failed"""
+    try:
+        shop_resolver.write_with_shops(partial(create_one, submission), [submission.payload["shop_link"]])
+    except Exception as exc:
+        logger.exception("Submission %s failed", submission.pk)
+        submission.status = Status.FAILED
+        submission.errors = {"non_field_errors": [str(exc)]}
+        submission.date_processed = timezone.now()
+        submission.save(update_fields=["status", "errors", "date_processed"])
+
+
+def create_one(submission: ReviewSubmission, shop_pks: dict):
+    review = make_review(submission, shop_pks)
+    with transaction.atomic():
+        review.save()
+        finish([submission], [review])
+
+
+def finish(submissions, reviews):
+    """Marks submissions as created, reviews are linked only if db returns pks of bulk inserted rows"""
+    now = timezone.now()
+    for submission, review in zip(submissions, reviews):
+        submission.status = Status.CREATED
+        submission.review_id = review.pk
+        submission.date_processed = now
+    ReviewSubmission.objects.bulk_update(submissions, ["status", "review", "date_processed"])
+
+
+class SubmissionWorker(threading.Thread):
+    """
+    Processes submissions in a daemon thread of the web process, when there is no separate worker
+    started by process_review_submissions command. Sleeps for a poll interval, when the queue is empty
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, poll_interval: float):
+        super().__init__(name="review-submissions-worker", daemon=True)
+        self.poll_interval = poll_interval
+        self.wake_up = threading.Event()
+
+    @classmethod
+    def ensure_started(cls):
+        with cls._lock:
+            if cls._instance is None or not cls._instance.is_alive():
+                cls._instance = cls(poll_interval=settings.REVIEW_SUBMISSIONS_POLL_INTERVAL)
+                cls._instance.start()
+        # New submissions are seen after the transaction of the request is committed
+        transaction.on_commit(cls._instance.wake_up.set)
+
+    def run(self):
+        while True:
+            self.wake_up.wait(self.poll_interval)
+            self.wake_up.clear()
+            close_old_connections()
+            try:
+                process_submissions()
+            except Exception:
+                logger.exception("Processing of review submissions failed")
+            finally:
+                connection.close()
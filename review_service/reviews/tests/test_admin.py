@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from ..admin import EstimatedCountPaginator, estimate_count
+from ..models import Review, Shop
+
+
+class ReviewAdminTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@email.com", "password")
+        cls.rozetka = Shop.objects.create(name="Rozetka", domain_name="rozetka", link="https://rozetka.com.ua/")
+        cls.foxtrot = Shop.objects.create(name="Foxtrot", domain_name="foxtrot", link="https://www.foxtrot.com.ua/")
+        for number in range(4):
+            Review.objects.create(
+                title=f"Review #{number}", content="Content", stars=number + 1,
+                author_email=f"user{number}@email.com", shop=cls.rozetka if number % 2 else cls.foxtrot
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_changelist(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:reviews_review_changelist"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, queries
+
+    def test_changelist_queries_dont_depend_on_amount_of_reviews(self):
+        """Checks if shops are joined to reviews and a new review doesn't add a query"""
+        response, queries = self.get_changelist()
+        Review.objects.create(
+            title="Review #5", content="Content", stars=5, author_email="user5@email.com", shop=self.rozetka
+        )
+        response, more_queries = self.get_changelist()
+
+        self.assertContains(response, "Review #5")
+        self.assertEqual(len(more_queries), len(queries))
+        self.assertNotIn('"reviews_review"."content"', next(
+            query["sql"] for query in queries if 'FROM "reviews_review" INNER JOIN' in query["sql"]
+        ))
+
+    def test_search_by_author_domain_and_title(self):
+        """Checks if reviews are found by exact author email, exact shop domain and title"""
+        for search_term, expected_titles in [
+            ("user1@email.com", ["Review #1"]),
+            ("Foxtrot", ["Review #0", "Review #2"]),
+            ("#3", ["Review #3"]),
+            ("user1", []),
+        ]:
+            response, queries = self.get_changelist(q=search_term)
+            titles = sorted(review.title for review in response.context["cl"].result_list)
+            self.assertEqual(titles, expected_titles, search_term)
+
+    def test_shop_is_chosen_by_autocomplete(self):
+        """Checks if the change form doesn't load every shop into a dropdown"""
+        review = Review.objects.first()
+        response = self.client.get(reverse("admin:reviews_review_change", args=[review.pk]))
+
+        self.assertContains(response, "admin-autocomplete")
+        self.assertNotContains(response, f'<option value="{self.rozetka.pk}">Rozetka</option>')
+
+    def test_estimated_count(self):
+        """Checks if rows are counted exactly where the planner's estimate isn't available"""
+        queryset = Review.objects.order_by("pk")
+
+        self.assertIsNone(estimate_count(queryset))
+        self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 4)
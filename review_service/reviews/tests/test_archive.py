@@ -0,0 +1,130 @@
+import io
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from ..models import ArchivedReview, Review, Shop, ShopDailyStats
+from ..ratings import rebuild_daily_stats, rebuild_ratings
+from ..shops import shop_resolver
+
+
+@override_settings(REVIEW_ARCHIVE_AFTER_DAYS=365, SHOP_RECENT_REVIEWS=3)
+class ArchiveTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = Shop.objects.create(name="Rozetka", domain_name="rozetka", link="https://rozetka.com.ua/")
+        for number in range(1, 5):
+            Review.objects.create(
+                title=f"Review #{number}", content=f"Content #{number}", stars=number,
+                author_email=f"user{number}@email.com", shop=cls.shop
+            )
+        for number in (1, 2):
+            Review.objects.filter(title=f"Review #{number}").update(
+                date_created=timezone.now() - timedelta(days=800 - number)
+            )
+        rebuild_ratings()
+        rebuild_daily_stats()
+
+    def setUp(self):
+        shop_resolver.invalidate()
+        cache.clear()
+
+    def archive(self, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("archive_reviews", *args, stdout=io.StringIO())
+
+    @staticmethod
+    def snapshot_aggregates():
+        return (
+            list(Shop.objects.values("reviews_count", "stars_sum", "rating", "stars_1", "stars_4")),
+            list(ShopDailyStats.objects.order_by("day").values("day", "reviews_count", "stars_sum")),
+        )
+
+    def test_old_reviews_are_moved_in_batches(self):
+        """Checks if only old reviews are moved with their pks and content, also by a resumed run"""
+        old = {review.pk: review.content for review in Review.objects.filter(title__in=["Review #1", "Review #2"])}
+        self.archive("--batch-size", "1")
+        self.archive()
+
+        self.assertEqual(sorted(Review.objects.values_list("title", flat=True)), ["Review #3", "Review #4"])
+        self.assertEqual({review.pk: review.content for review in ArchivedReview.objects.all()}, old)
+        self.assertEqual(ArchivedReview.objects.get(title="Review #1").excerpt, "Content #1")
+
+    def test_aggregates_keep_counting_archived_reviews(self):
+        """Checks if archiving changes neither shop aggregates nor daily stats, and rebuilds count archived reviews"""
+        aggregates = self.snapshot_aggregates()
+        shops = self.client.get(reverse("shops"), {"order": "-rating"}).data
+
+        self.archive()
+        cache.clear()
+
+        self.assertEqual(self.snapshot_aggregates(), aggregates)
+        self.assertEqual(self.client.get(reverse("shops"), {"order": "-rating"}).data, shops)
+        rebuild_ratings()
+        rebuild_daily_stats()
+        self.assertEqual(self.snapshot_aggregates(), aggregates)
+
+    def test_archived_review_is_retrieved(self):
+        """Checks if a detail of an archived review is the same, but it's neither listed nor changed"""
+        review = Review.objects.get(title="Review #1")
+        url = reverse("review-detail", args=[review.pk])
+        detail = self.client.get(url).data
+
+        self.archive()
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, detail)
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        listed = [review["title"] for review in self.client.get(reverse("review-list")).data["results"]]
+        self.assertEqual(listed, ["Review #4", "Review #3"])
+        patched = self.client.patch(url, {"stars": 5}, content_type="application/json")
+        self.assertEqual(patched.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse("review-detail", args=[1000])).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_review_list_is_returned_after_archival(self):
+        """Checks if ETag of lists changes, when reviews leave them for the archive"""
+        url = reverse("review-list")
+        etag = self.client.get(url)["ETag"]
+
+        self.archive()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_recent_reviews_of_shop_include_archived_ones(self):
+        """Checks if latest reviews of a shop are topped up from the archive, when too few of them are left"""
+        url = reverse("shop-detail", args=[self.shop.pk])
+        recent_reviews = self.client.get(url).data["recent_reviews"]
+
+        self.archive()
+        cache.clear()
+
+        self.assertEqual(self.client.get(url).data["recent_reviews"], recent_reviews)
+        self.assertEqual(
+            [review["title"] for review in recent_reviews], ["Review #4", "Review #3", "Review #2"]
+        )
+
+    def test_archived_reviews_are_batch_read(self):
+        """Checks if a batch read returns archived reviews like their details, reading the archive only for misses"""
+        archived, hot = Review.objects.get(title="Review #1"), Review.objects.get(title="Review #4")
+        detail = self.client.get(reverse("review-detail", args=[archived.pk])).data
+
+        self.archive()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("batch"), {"reviews": f"{archived.pk},{hot.pk},1000"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["reviews"][str(archived.pk)], detail)
+        self.assertEqual(response.data["reviews"][str(hot.pk)]["title"], "Review #4")
+        self.assertIsNone(response.data["reviews"]["1000"])
+        with self.assertNumQueries(1):
+            self.client.get(reverse("batch"), {"reviews": f"{hot.pk}"})
@@ -0,0 +1,90 @@
+import io
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import TestCase
+
+from ..benchmarks import percentile, run_benchmarks
+from ..models import Review, Shop
+from ..seeding import seed
+from ..shops import shop_resolver
+
+
+class SeedTest(TestCase):
+
+    def test_seed_creates_skewed_reviews(self):
+        """Checks if passed amounts are created and the first shop has the most reviews"""
+        self.assertEqual(seed(shops_amount=10, reviews_per_shop=20, skew=1.5, batch_size=50), (10, 200))
+
+        self.assertEqual(Shop.objects.count(), 10)
+        self.assertEqual(Review.objects.count(), 200)
+        counts = list(Shop.objects.order_by("id").values_list("reviews_count", flat=True))
+        self.assertEqual(max(counts), counts[0])
+        # Aggregates are kept in sync by bulk inserts
+        self.assertEqual(Shop.objects.aggregate(total=Sum("reviews_count"))["total"], 200)
+
+    def test_seed_is_reproducible(self):
+        """Checks if the same seed spreads reviews over shops the same way"""
+        def spread():
+            return list(Review.objects.values("shop__domain_name", "stars").annotate(
+                amount=Count("id")
+            ).order_by("shop__domain_name", "stars"))
+
+        seed(shops_amount=5, reviews_per_shop=10, random_seed=1)
+        first_spread = spread()
+        Shop.objects.all().delete()
+        seed(shops_amount=5, reviews_per_shop=10, random_seed=1)
+
+        self.assertEqual(spread(), first_spread)
+
+    def test_seed_command_runs_only_in_test_database(self):
+        """Checks if seed_reviews seeds the test database, but refuses to touch any other one"""
+        call_command("seed_reviews", "--shops", "2", "--reviews-per-shop", "3", stdout=io.StringIO())
+        self.assertEqual(Review.objects.count(), 6)
+
+        name = connection.settings_dict["NAME"]
+        connection.settings_dict["NAME"] = "reviews"
+        try:
+            with self.assertRaises(CommandError):
+                call_command("seed_reviews", "--shops", "2", stdout=io.StringIO())
+        finally:
+            connection.settings_dict["NAME"] = name
+        self.assertEqual(Review.objects.count(), 6)
+
+
+class RunBenchmarksTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(shops_amount=3, reviews_per_shop=5)
+
+    def setUp(self):
+        shop_resolver.invalidate()
+        cache.clear()
+
+    def test_report_of_every_scenario(self):
+        """Checks if every scenario is measured without errors"""
+        report = run_benchmarks(requests=3, warmup=1)
+
+        self.assertEqual(report["dataset"], {"shops": 3, "reviews": 15})
+        self.assertEqual(len(report["scenarios"]), 10)
+        for name, result in report["scenarios"].items():
+            self.assertEqual(result["errors"], 0, name)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+            self.assertGreater(result["queries_per_request"], 0)
+
+    def test_report_of_passed_scenarios(self):
+        """Checks if only passed scenarios are run"""
+        report = run_benchmarks(requests=2, warmup=0, names=["shops_list"])
+
+        self.assertEqual(list(report["scenarios"]), ["shops_list"])
+
+    def test_percentile(self):
+        """Checks nearest-rank percentiles"""
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
@@ -0,0 +1,114 @@
+import io
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from ..ingest import ingest_reviews
+from ..models import Review, ReviewDeletion, Shop
+
+
+@override_settings(REVIEW_CHANGES_LAG=0)
+class ChangeFeedTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("review-changes")
+        cls.shop = Shop.objects.create(name="Rozetka", domain_name="rozetka", link="https://rozetka.com.ua/")
+        cls.reviews = [
+            Review.objects.create(
+                title=f"Review #{number}", content="Content", stars=number, author_email=f"user{number}@email.com",
+                shop=cls.shop
+            ) for number in range(1, 4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def sync(self, cursor=None, limit=100):
+        """Follows the feed from cursor until it is caught up, returns changes and the last cursor"""
+        changes = []
+        while True:
+            params = {"limit": limit} if cursor is None else {"limit": limit, "cursor": cursor}
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), limit)
+            changes.extend(response.data["results"])
+            cursor = response.data["cursor"]
+            if not response.data["has_more"]:
+                return changes, cursor
+
+    def test_pages_of_all_reviews_from_the_beginning(self):
+        """Checks if reviews are returned from the least recently updated in bounded pages"""
+        changes, cursor = self.sync(limit=2)
+
+        self.assertEqual([(change["op"], change["id"]) for change in changes], [
+            ("upsert", review.pk) for review in self.reviews
+        ])
+        self.assertEqual(changes[0]["review"]["title"], "Review #1")
+        self.assertEqual(self.sync(cursor), ([], cursor))
+
+    def test_only_changes_after_cursor(self):
+        """Checks if updated and deleted reviews follow the cursor, deletions of every kind leave tombstones"""
+        changes, cursor = self.sync()
+        review, deleted, bulk_deleted = self.reviews
+        self.client.patch(reverse("review-detail", args=[review.pk]), {"stars": 5}, content_type="application/json")
+        self.client.delete(reverse("review-detail", args=[deleted.pk]))
+        Review.objects.filter(pk=bulk_deleted.pk).bulk_delete()
+
+        changes, cursor = self.sync(cursor, limit=1)
+
+        self.assertEqual([(change["op"], change["id"]) for change in changes], [
+            ("upsert", review.pk), ("delete", deleted.pk), ("delete", bulk_deleted.pk)
+        ])
+        self.assertEqual(changes[0]["review"]["stars"], 5)
+        self.assertNotIn("review", changes[1])
+
+    def test_changes_are_served_after_lag(self):
+        """Checks if recent changes, which a late transaction may still precede, aren't served yet"""
+        with override_settings(REVIEW_CHANGES_LAG=60):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.data["results"], [])
+        self.assertFalse(response.data["has_more"])
+
+    def test_page_is_read_by_two_queries(self):
+        """Checks if a page takes one query of reviews and one of tombstones, whatever the cursor is"""
+        changes, cursor = self.sync(limit=1)
+
+        with self.assertNumQueries(2):
+            self.client.get(self.url, {"cursor": cursor, "fields": "id,title"})
+
+    @override_settings(REVIEW_CHANGES_LAG=-1)
+    def test_writes_longer_than_lag_are_rolled_back(self):
+        """Checks if bulk writes, which would be committed behind cursors of the feed, change nothing"""
+        with self.assertRaises(DatabaseError):
+            Review.objects.all().bulk_modify(stars=1)
+        with self.assertRaises(DatabaseError):
+            ingest_reviews([{
+                "title": "New", "content": "New", "stars": 5, "author_email": "new@email.com",
+                "shop_link": "https://rozetka.com.ua/",
+            }])
+
+        self.assertEqual(sorted(Review.objects.values_list("stars", flat=True)), [1, 2, 3])
+
+    def test_HTTP400_when_cursor_is_invalid(self):
+        """Checks if a malformed cursor is rejected"""
+        for cursor in ["abc", "bm90fGF8Y3Vyc29y"]:
+            response = self.client.get(self.url, {"cursor": cursor})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, cursor)
+
+    def test_old_tombstones_are_pruned(self):
+        """Checks if tombstones older than the retention period are deleted"""
+        old_pk, recent_pk = self.reviews[0].pk, self.reviews[1].pk
+        Review.objects.filter(pk__in=[old_pk, recent_pk]).bulk_delete()
+        ReviewDeletion.objects.filter(review_id=old_pk).update(date_deleted=timezone.now() - timedelta(days=31))
+
+        call_command("prune_review_deletions", days=30, stdout=io.StringIO())
+
+        self.assertEqual(list(ReviewDeletion.objects.values_list("review_id", flat=True)), [recent_pk])
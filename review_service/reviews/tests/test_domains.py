@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import tldextract
+from django.test import SimpleTestCase
+
+from ..domains import DomainExtractor, PublicSuffixTrie, domain_extractor
+
+LINKS_PATH = Path(__file__).resolve().parent / "data" / "shop_links.txt"
+
+
+class DomainExtractorTest(SimpleTestCase):
+
+    def test_same_parts_as_tldextract(self):
+        """Checks if recorded shop links are split the same way as tldextract with its bundled snapshot does"""
+        reference = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+        extractor = DomainExtractor(maxsize=100)
+
+        for link in LINKS_PATH.read_text(encoding="utf-8").splitlines():
+            with self.subTest(link=link):
+                self.assertEqual(tuple(extractor.extract(link)), tuple(reference(link)))
+
+    def test_trie_is_loaded_on_startup(self):
+        """Checks if the shared extractor has built the trie in ReviewsConfig.ready()"""
+        self.assertIsInstance(domain_extractor._trie, PublicSuffixTrie)
+
+    def test_seen_hosts_are_remembered(self):
+        """Checks if links of an already split host are served by the cache"""
+        extractor = DomainExtractor(maxsize=100)
+        extractor.extract("https://rozetka.com.ua/")
+        parts = extractor.extract("https://rozetka.com.ua/ua/mobile-phones/")
+
+        self.assertEqual(parts.domain, "rozetka")
+        self.assertEqual(extractor.split_host.cache_info().hits, 1)
+
+    def test_rules(self):
+        """Checks if the longest rule wins, wildcard and exception rules are applied"""
+        trie = PublicSuffixTrie(["uk", "co.uk", "*.ck", "!www.ck"])
+
+        self.assertEqual(trie.suffix_index(["shop", "co", "uk"]), 1)
+        self.assertEqual(trie.suffix_index(["shop", "example", "ck"]), 1)
+        self.assertEqual(trie.suffix_index(["www", "ck"]), 1)
+        self.assertEqual(trie.suffix_index(["localhost"]), 1)
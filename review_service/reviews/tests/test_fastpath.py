@@ -0,0 +1,61 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from ..fastpath import ValuesSerializer
+from ..models import Review, Shop
+from ..renderers import FastJSONRenderer
+from ..serializers import ReviewSerializer, ShopSerializer
+
+
+class FastListTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name="Rozetka", domain_name="rozetka", link="https://rozetka.com.ua/")
+        for number in range(3):
+            Review.objects.create(
+                title=f"Review #{number} \u2028 \"quoted\"",
+                content="Ünïcödé content \u2029 with separators",
+                shop=shop,
+                stars=number + 1,
+                author_email=f"user{number}@email.com"
+            )
+
+    def test_values_serializer_output_equals_model_serializer(self):
+        """Checks if rows are represented exactly as ReviewSerializer represents instances"""
+        values_serializer = ValuesSerializer(ReviewSerializer())
+        rows = Review.objects.order_by("id").values(*values_serializer.columns)
+        expected = ReviewSerializer(Review.objects.order_by("id"), many=True).data
+
+        self.assertEqual(values_serializer.to_representation(rows), expected)
+        self.assertEqual(
+            list(values_serializer.to_representation(rows)[0]), list(expected[0])
+        )
+
+    def test_fast_renderer_output_equals_json_renderer(self):
+        """Checks if FastJSONRenderer renders the same bytes as JSONRenderer"""
+        data = {"next": None, "results": ReviewSerializer(Review.objects.order_by("id"), many=True).data}
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_review_list_response_equals_regular_response(self):
+        """Checks if list response is byte-compatible with serializing model instances"""
+        response = self.client.get(reverse("review-list"))
+        serializer = ReviewSerializer()
+        # Lists leave content out by default
+        serializer.fields.pop("content")
+        expected = JSONRenderer().render({
+            "next": None,
+            "previous": None,
+            "results": [
+                serializer.to_representation(review) for review in Review.objects.order_by("-date_created", "-id")
+            ],
+        })
+
+        self.assertEqual(response.content, expected)
+
+    def test_values_serializer_flags_floats(self):
+        """Checks if serializer with float fields is flagged, so it isn't rendered by orjson"""
+        self.assertFalse(ValuesSerializer(ReviewSerializer()).has_floats)
+        self.assertTrue(ValuesSerializer(ShopSerializer()).has_floats)
@@ -0,0 +1,97 @@
+import re
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from ..metrics import Histogram, registry
+from ..models import Review, Shop
+
+
+class RequestMetricsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Shop.objects.create(name="Rozetka", domain_name="rozetka", link="https://rozetka.com.ua/")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_of_sampled_request(self):
+        """Checks if SQL, view, render, serialize and total timings are sent in Server-Timing header"""
+        response = self.client.get(reverse("shops"), {"order": "rate"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = self.get_timings(response)
+        self.assertEqual(list(timings), ["sql", "view", "render", "serialize", "total"])
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+        self.assertLessEqual(float(timings["view"]), float(timings["total"]))
+        self.assertLessEqual(float(timings["serialize"]), float(timings["view"]))
+
+    def test_serialize_timing_of_reviews(self):
+        """Checks if serialization is timed on the fast list path and on the regular detail path"""
+        review = Review.objects.create(
+            title="Review", content="Content", shop=Shop.objects.get(), stars=5, author_email="user@email.com"
+        )
+        labels = ("api/reviews/(?P<pk>[^/.]+)/$", "GET", "200")
+        serialize_count = self.get_count(registry.serialize_duration, labels)
+
+        for url in (reverse("review-list"), reverse("review-detail", args=[review.pk])):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn("serialize", self.get_timings(response), url)
+
+        self.assertEqual(self.get_count(registry.serialize_duration, labels), serialize_count + 1)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_only_duration_of_request_out_of_sample(self):
+        """Checks if a request out of sample is only counted by the duration histogram"""
+        labels = ("api/shops/", "GET", "200")
+        durations_count = self.get_count(registry.request_duration, labels)
+        queries_count = self.get_count(registry.queries, labels)
+
+        response = self.client.get(reverse("shops"))
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(self.get_count(registry.request_duration, labels), durations_count + 1)
+        self.assertEqual(self.get_count(registry.queries, labels), queries_count)
+
+    def test_metrics_endpoint(self):
+        """Checks if histograms are exposed per route in Prometheus text format"""
+        self.client.get(reverse("shops"))
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        content = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", content)
+        self.assertIn('http_request_sql_queries_bucket{route="api/shops/",method="GET",status="200",le="2"}', content)
+
+    @staticmethod
+    def get_timings(response):
+        return dict(re.findall(r"(\w+);dur=([\d.]+)", response["Server-Timing"]))
+
+    @staticmethod
+    def get_count(histogram, labels):
+        counts, total = histogram.series.get(labels, ([0], 0))
+        return sum(counts)
+
+
+class HistogramTest(TestCase):
+
+    def test_render_cumulative_buckets(self):
+        """Checks if buckets are cumulative and sum and count are rendered"""
+        histogram = Histogram("test_seconds", "Test.", (0.1, 1))
+        for value in (0.05, 0.5, 0.7, 5):
+            histogram.observe(("a",), value)
+
+        self.assertEqual(histogram.render(("route",)), [
+            "# HELP test_seconds Test.",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{route="a",le="0.1"} 1',
+            'test_seconds_bucket{route="a",le="1"} 3',
+            'test_seconds_bucket{route="a",le="+Inf"} 4',
+            'test_seconds_sum{route="a"} 6.25',
+            'test_seconds_count{route="a"} 4',
+        ])
@@ -1,6 +1,8 @@
+from django.db import connection
 from django.test import TestCase
 
-from ..models import Review, Shop
+from ..fields import CompressedTextField
+from ..models import EXCERPT_LENGTH, Review, Shop
 
 
 class ShopModelTest(TestCase):
@@ -63,3 +65,59 @@ class ReviewModelTest(TestCase):
         review = Review.objects.get(pk=1)
         expected_object_name = f"{review.title} for {review.shop.name}"
         self.assertEqual(str(review), expected_object_name)
+
+
+class CompressedContentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = Shop.objects.create(name="Rozetka", domain_name="rozetka", link="https://rozetka.com.ua/")
+
+    def create_review(self, content):
+        return Review.objects.create(
+            title="Test review", content=content, shop=self.shop, stars=3, author_email="user@email.com"
+        )
+
+    def get_stored_content(self, review):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT content FROM reviews_review WHERE id = %s", [review.pk])
+            return bytes(cursor.fetchone()[0])
+
+    def test_short_content_is_stored_raw(self):
+        """Checks if content below the threshold is kept as it is behind the marker byte"""
+        review = self.create_review("Short content")
+
+        self.assertEqual(self.get_stored_content(review), CompressedTextField.RAW + b"Short content")
+        self.assertEqual(Review.objects.get(pk=review.pk).content, "Short content")
+
+    def test_long_content_is_compressed(self):
+        """Checks if long content is stored compressed and read back as it was"""
+        content = "Великий відгук про магазин. " * 100
+        review = self.create_review(content)
+
+        stored = self.get_stored_content(review)
+        self.assertEqual(stored[:1], CompressedTextField.ZLIB)
+        self.assertLess(len(stored), len(content.encode()))
+        self.assertEqual(Review.objects.get(pk=review.pk).content, content)
+        self.assertEqual(Review.objects.values_list("content", flat=True).get(pk=review.pk), content)
+
+    def test_excerpt_is_filled_on_save(self):
+        """Checks if excerpt follows content and is cut by a word boundary"""
+        review = self.create_review("word " * 100)
+        self.assertLessEqual(len(review.excerpt), EXCERPT_LENGTH)
+        self.assertTrue(review.excerpt.endswith("word…"))
+
+        review.content = "Edited"
+        review.save(update_fields=["content"])
+        self.assertEqual(Review.objects.get(pk=review.pk).excerpt, "Edited")
+
+    def test_excerpt_is_filled_by_bulk_create_and_bulk_modify(self):
+        """Checks if excerpts are made by set-based writes too"""
+        Review.objects.bulk_create([
+            Review(title=f"Review #{number}", content=f"Content #{number}", shop=self.shop, stars=3,
+                   author_email="user@email.com")
+            for number in range(2)
+        ])
+        self.assertEqual(sorted(Review.objects.values_list("excerpt", flat=True)), ["Content #0", "Content #1"])
+
+        Review.objects.all().bulk_modify(content="Moderated")
+        self.assertEqual(set(Review.objects.values_list("excerpt", "content")), {("Moderated", "Moderated")})
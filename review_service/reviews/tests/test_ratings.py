@@ -0,0 +1,158 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Review, Shop, ShopDailyStats
+from ..ratings import rebuild_daily_stats
+
+
+class ShopRatingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop_1 = Shop.objects.create(name="Rozetka", domain_name="rozetka", link="https://rozetka.com.ua/")
+        cls.shop_2 = Shop.objects.create(name="Foxtrot", domain_name="foxtrot", link="https://www.foxtrot.com.ua/")
+
+    def create_review(self, shop, stars):
+        return Review.objects.create(
+            title="Test review",
+            content="Test content",
+            shop=shop,
+            stars=stars,
+            author_email="user@email.com"
+        )
+
+    def assertRating(self, shop, reviews_count, stars_sum, histogram):
+        shop.refresh_from_db()
+        self.assertEqual(shop.reviews_count, reviews_count)
+        self.assertEqual(shop.stars_sum, stars_sum)
+        self.assertEqual([getattr(shop, Shop.stars_field(stars)) for stars in range(1, 6)], histogram)
+        if reviews_count:
+            self.assertAlmostEqual(shop.rating, stars_sum / reviews_count)
+        else:
+            self.assertIsNone(shop.rating)
+
+    def test_rating_when_reviews_are_created(self):
+        """Checks if aggregates count every created review"""
+        self.create_review(self.shop_1, 5)
+        self.create_review(self.shop_1, 2)
+
+        self.assertRating(self.shop_1, 2, 7, [0, 1, 0, 0, 1])
+        self.assertRating(self.shop_2, 0, 0, [0, 0, 0, 0, 0])
+
+    def test_rating_when_stars_are_updated(self):
+        """Checks if stars are moved in histogram, when they are changed"""
+        review = self.create_review(self.shop_1, 5)
+        review = Review.objects.get(pk=review.pk)
+        review.stars = 1
+        review.save()
+
+        self.assertRating(self.shop_1, 1, 1, [1, 0, 0, 0, 0])
+
+    def test_rating_when_shop_is_changed(self):
+        """Checks if review is moved from old shop aggregates to new ones, when shop is changed"""
+        review = self.create_review(self.shop_1, 4)
+        review.shop = self.shop_2
+        review.stars = 3
+        review.save()
+
+        self.assertRating(self.shop_1, 0, 0, [0, 0, 0, 0, 0])
+        self.assertRating(self.shop_2, 1, 3, [0, 0, 1, 0, 0])
+
+    def test_rating_when_review_without_loaded_values_is_updated(self):
+        """Checks if previous stars are read from db, when saved instance wasn't loaded from it"""
+        review = self.create_review(self.shop_1, 4)
+        Review(
+            pk=review.pk,
+            title=review.title,
+            content=review.content,
+            shop=self.shop_1,
+            stars=2,
+            author_email=review.author_email,
+            date_created=review.date_created,
+        ).save()
+
+        self.assertRating(self.shop_1, 1, 2, [0, 1, 0, 0, 0])
+
+    def test_rating_when_review_is_deleted(self):
+        """Checks if deleted review is removed from aggregates"""
+        self.create_review(self.shop_1, 4)
+        self.create_review(self.shop_1, 2).delete()
+
+        self.assertRating(self.shop_1, 1, 4, [0, 0, 0, 1, 0])
+
+    def test_rebuild_shop_ratings_command(self):
+        """Checks if rebuild_shop_ratings command restores drifted aggregates"""
+        self.create_review(self.shop_1, 4)
+        self.create_review(self.shop_2, 1)
+        Shop.objects.update(reviews_count=10, stars_sum=3, rating=0.3, stars_1=0, stars_4=7)
+
+        out = StringIO()
+        call_command("rebuild_shop_ratings", stdout=out)
+
+        self.assertIn("Rebuilt ratings of 2 shops", out.getvalue())
+        self.assertRating(self.shop_1, 1, 4, [0, 0, 0, 1, 0])
+        self.assertRating(self.shop_2, 1, 1, [1, 0, 0, 0, 0])
+
+
+class ShopDailyStatsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop_1 = Shop.objects.create(name="Rozetka", domain_name="rozetka", link="https://rozetka.com.ua/")
+        cls.shop_2 = Shop.objects.create(name="Foxtrot", domain_name="foxtrot", link="https://www.foxtrot.com.ua/")
+
+    def create_review(self, shop, stars):
+        return Review.objects.create(
+            title="Test review", content="Test content", shop=shop, stars=stars, author_email="user@email.com"
+        )
+
+    def get_stats(self, shop):
+        return list(ShopDailyStats.objects.filter(shop=shop).order_by("day").values_list(
+            "day", "reviews_count", "stars_sum", "stars_1", "stars_2", "stars_3", "stars_4", "stars_5"
+        ))
+
+    def test_stats_when_reviews_are_created_and_updated(self):
+        """Checks if today's stats count created reviews and move changed stars and shops"""
+        today = timezone.localdate()
+        self.create_review(self.shop_1, 5)
+        review = self.create_review(self.shop_1, 2)
+        review.stars = 3
+        review.shop = self.shop_2
+        review.save()
+
+        self.assertEqual(self.get_stats(self.shop_1), [(today, 1, 5, 0, 0, 0, 0, 1)])
+        self.assertEqual(self.get_stats(self.shop_2), [(today, 1, 3, 0, 0, 1, 0, 0)])
+
+    def test_stats_when_reviews_are_bulk_created_and_deleted(self):
+        """Checks if bulk created reviews are counted and deleted ones are removed"""
+        Review.objects.bulk_create([
+            Review(title="Review", content="Content", shop=self.shop_1, stars=stars, author_email="user@email.com")
+            for stars in (1, 4, 4)
+        ])
+        Review.objects.filter(stars=1).first().delete()
+
+        self.assertEqual(self.get_stats(self.shop_1), [(timezone.localdate(), 2, 8, 0, 0, 0, 2, 0)])
+
+    def test_stats_when_shop_is_deleted(self):
+        """Checks if removals of a deleted shop's reviews don't recreate its stats"""
+        self.create_review(self.shop_1, 4)
+        self.shop_1.delete()
+
+        self.assertFalse(ShopDailyStats.objects.exists())
+
+    def test_rebuild_daily_stats(self):
+        """Checks if stats are recalculated by days reviews were created on"""
+        today = timezone.localdate()
+        self.create_review(self.shop_1, 4)
+        old_review = self.create_review(self.shop_1, 2)
+        Review.objects.filter(pk=old_review.pk).update(date_created=timezone.now() - timedelta(days=3))
+
+        self.assertEqual(rebuild_daily_stats(), 2)
+        self.assertEqual(self.get_stats(self.shop_1), [
+            (today - timedelta(days=3), 1, 2, 0, 1, 0, 0, 0),
+            (today, 1, 4, 0, 0, 0, 1, 0),
+        ])
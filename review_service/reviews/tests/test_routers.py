@@ -0,0 +1,111 @@
+import time
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from ..models import Review, Shop
+from ..routers import PrimaryStickinessMiddleware, ReplicaRouter, STICKY_HEADER, replica_health
+
+REPLICA = "replica"
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaRouterTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The second SQLite database stands in for a replica, it has its own shops to tell reads apart.
+        # It's added after the primary is wrapped in a transaction and is dropped with the class
+        connections.settings[REPLICA] = {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+        with connections[REPLICA].schema_editor() as editor:
+            editor.create_model(Shop)
+        Shop.objects.using(REPLICA).create(name="Replica", domain_name="replica", link="https://replica.com/")
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        replica_health.checks.clear()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name="Primary", domain_name="primary", link="https://primary.com/")
+        cls.review = Review.objects.create(
+            title="Review", content="Content", shop=shop, stars=5, author_email="user@email.com"
+        )
+
+    def setUp(self):
+        cache.clear()
+        replica_health.checks.clear()
+
+    def get_shop_names(self, **headers):
+        response = self.client.get(reverse("shops"), **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [shop["name"] for shop in response.data]
+
+    def test_safe_request_reads_from_replica(self):
+        """Checks if shops are read from the replica, when the client hasn't written anything"""
+        self.assertEqual(self.get_shop_names(), ["Replica"])
+
+    def test_reads_stick_to_primary_after_write(self):
+        """Checks if the client reads from the primary after a successful write"""
+        response = self.client.patch(
+            reverse("review-detail", args=[self.review.pk]), {"stars": 4}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(STICKY_HEADER, response)
+        self.assertEqual(self.get_shop_names(), ["Primary"])
+
+    def test_reads_stick_to_primary_when_header_is_passed(self):
+        """Checks if a client without cookies can stick to the primary with the header"""
+        primary_until = PrimaryStickinessMiddleware.sign_deadline(int(time.time()) + 5)
+
+        self.assertEqual(self.get_shop_names(HTTP_X_PRIMARY_UNTIL=primary_until), ["Primary"])
+
+    def test_reads_go_to_replica_when_sticky_window_is_over(self):
+        """Checks if an expired deadline doesn't pin reads to the primary"""
+        primary_until = PrimaryStickinessMiddleware.sign_deadline(int(time.time()) - 1)
+
+        self.assertEqual(self.get_shop_names(HTTP_X_PRIMARY_UNTIL=primary_until), ["Replica"])
+
+    def test_reads_go_to_replica_when_deadline_is_forged(self):
+        """Checks if unsigned deadlines and signed ones beyond the sticky window don't pin reads to the primary"""
+        for primary_until in (
+            "9999999999", str(time.time() + 5), PrimaryStickinessMiddleware.sign_deadline(9999999999)
+        ):
+            self.assertEqual(self.get_shop_names(HTTP_X_PRIMARY_UNTIL=primary_until), ["Replica"], primary_until)
+
+    @override_settings(REPLICA_DATABASES=["missing_replica"])
+    def test_reads_go_to_primary_when_replica_is_down(self):
+        """Checks if an unavailable replica is skipped"""
+        self.assertEqual(self.get_shop_names(), ["Primary"])
+        self.assertFalse(replica_health.checks["missing_replica"][1])
+
+    def test_reads_go_to_primary_outside_requests(self):
+        """Checks if commands and signals read from the primary"""
+        self.assertEqual(ReplicaRouter().db_for_read(Shop), "default")
+
+    def test_replica_reads_are_not_cached(self):
+        """Checks if a result read from a replica isn't served later, when it may be behind the primary"""
+        self.assertEqual(self.get_shop_names(), ["Replica"])
+
+        with override_settings(REPLICA_DATABASES=[]):
+            self.assertEqual(self.get_shop_names(), ["Primary"])
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_sticky_reads_bypass_cache(self):
+        """Checks if a client sticky to the primary reads past cached results"""
+        self.assertEqual(self.get_shop_names(), ["Primary"])
+        # Changed without signals, so the cached result stays
+        Shop.objects.using("default").update(name="Changed")
+        primary_until = PrimaryStickinessMiddleware.sign_deadline(int(time.time()) + 5)
+
+        self.assertEqual(self.get_shop_names(), ["Primary"])
+        self.assertEqual(self.get_shop_names(HTTP_X_PRIMARY_UNTIL=primary_until), ["Changed"])
@@ -0,0 +1,128 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+
+from ..ingest import ingest_reviews
+from ..models import Review, Shop
+from ..shops import ShopResolver, shop_resolver
+from ..submissions import process_submissions, submit_review
+
+
+class ShopResolverTest(TestCase):
+
+    def setUp(self):
+        self.resolver = ShopResolver(maxsize=100)
+        shop_resolver.invalidate()
+
+    def test_shop_is_created_with_link(self):
+        """Checks if a new shop is created with name, domain_name and link, when link's domain is new"""
+        shop_pk = self.resolver.get_shop_pk("https://rozetka.com.ua/")
+
+        shop = Shop.objects.get(pk=shop_pk)
+        self.assertEqual(shop.name, "Rozetka")
+        self.assertEqual(shop.domain_name, "rozetka")
+        self.assertEqual(shop.link, "https://rozetka.com.ua/")
+
+    def test_existing_shop_is_returned_for_other_link(self):
+        """Checks if no shop is created, when link's domain already has a shop"""
+        shop = Shop.objects.create(name="Rozetka", domain_name="rozetka", link="https://rozetka.com.ua/")
+
+        self.assertEqual(self.resolver.get_shop_pk("https://rozetka.com.ua/ua/mobile-phones/"), shop.pk)
+        self.assertEqual(Shop.objects.count(), 1)
+
+    def test_no_queries_when_link_is_resolved_again(self):
+        """Checks if already resolved link and domain don't hit db"""
+        shop_pk = self.resolver.get_shop_pk("https://rozetka.com.ua/")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.resolver.get_shop_pk("https://rozetka.com.ua/"), shop_pk)
+            self.assertEqual(self.resolver.get_shop_pk("https://rozetka.com.ua/notebooks/"), shop_pk)
+
+    def test_cache_is_bounded(self):
+        """Checks if least recently used links are evicted, when cache is full"""
+        resolver = ShopResolver(maxsize=2)
+        resolver.get_shop_pk("https://rozetka.com.ua/")
+        resolver.get_shop_pk("https://www.foxtrot.com.ua/")
+
+        self.assertEqual(len(resolver._cache), 2)
+        self.assertNotIn(("link", "https://rozetka.com.ua/"), resolver._cache)
+
+    def test_cache_is_invalidated_when_shop_is_deleted(self):
+        """Checks if link of deleted shop creates a new shop"""
+        shop_pk = shop_resolver.get_shop_pk("https://rozetka.com.ua/")
+        Shop.objects.get(pk=shop_pk).delete()
+
+        new_shop_pk = shop_resolver.get_shop_pk("https://rozetka.com.ua/")
+        self.assertNotEqual(new_shop_pk, shop_pk)
+        self.assertTrue(Shop.objects.filter(pk=new_shop_pk).exists())
+
+
+class DeletedShopTest(TransactionTestCase):
+    """Foreign keys are checked on commit, so writes of reviews are committed here"""
+    link = "https://rozetka.com.ua/"
+
+    def setUp(self):
+        shop_resolver.invalidate()
+        cache.clear()
+
+    def delete_shop_elsewhere(self):
+        """Deletes shop of the link without signals, so it stays remembered, like after deletion by another process"""
+        shop_pk = shop_resolver.get_shop_pk(self.link)
+        Shop.objects.filter(pk=shop_pk)._raw_delete("default")
+        return shop_pk
+
+    def review_body(self, title):
+        return {
+            "title": title, "content": "Content", "stars": 5, "author_email": "user@email.com", "shop_link": self.link
+        }
+
+    def assert_review_has_new_shop(self, title, deleted_shop_pk):
+        shop_pk = Review.objects.get(title=title).shop_id
+        self.assertNotEqual(shop_pk, deleted_shop_pk)
+        self.assertEqual(shop_resolver.get_shop_pk(self.link), shop_pk)
+
+    def test_created_review_gets_new_shop(self):
+        """Checks if a review with link of a shop deleted by another process is created with a new shop"""
+        deleted_shop_pk = self.delete_shop_elsewhere()
+        response = self.client.post(
+            reverse("review-list"), json.dumps(self.review_body("Created")), content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assert_review_has_new_shop("Created", deleted_shop_pk)
+
+    def test_updated_review_gets_new_shop(self):
+        """Checks if a review moved by PATCH to a link of a shop deleted by another process gets a new shop"""
+        shop = Shop.objects.create(name="Foxtrot", domain_name="foxtrot", link="https://www.foxtrot.com.ua/")
+        review = Review.objects.create(
+            title="Updated", content="Content", stars=5, author_email="user@email.com", shop=shop
+        )
+        deleted_shop_pk = self.delete_shop_elsewhere()
+        response = self.client.patch(
+            reverse("review-detail", args=[review.pk]), {"shop_link": self.link}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assert_review_has_new_shop("Updated", deleted_shop_pk)
+        shop.refresh_from_db()
+        self.assertEqual(shop.reviews_count, 0)
+
+    def test_bulk_created_review_gets_new_shop(self):
+        """Checks if a bulk uploaded review with link of a shop deleted by another process is created with a new shop"""
+        deleted_shop_pk = self.delete_shop_elsewhere()
+        report = ingest_reviews([self.review_body("Bulk")])
+
+        self.assertEqual(report.created, 1)
+        self.assert_review_has_new_shop("Bulk", deleted_shop_pk)
+
+    def test_submitted_review_gets_new_shop(self):
+        """Checks if a queued review with link of a shop deleted by another process is created with a new shop"""
+        deleted_shop_pk = self.delete_shop_elsewhere()
+        submission = submit_review(self.review_body("Submitted"))
+        process_submissions()
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, submission.Status.CREATED)
+        self.assert_review_has_new_shop("Submitted", deleted_shop_pk)
@@ -0,0 +1,128 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from ..models import Review, ReviewSubmission, Shop
+from ..shops import shop_resolver
+from ..submissions import process_batch, process_submissions, submit_review
+
+
+def review_body(number: int, link: str = "https://rozetka.com.ua/"):
+    return {
+        "title": f"Review #{number}",
+        "content": "Content",
+        "stars": number % 5 + 1,
+        "author_email": f"user{number}@email.com",
+        "shop_link": link,
+    }
+
+
+class AsyncCreateTest(TestCase):
+
+    def setUp(self):
+        shop_resolver.invalidate()
+        cache.clear()
+
+    def test_HTTP202_when_async_create_is_preferred(self):
+        """Checks if the review is queued, but not created, and its submission can be tracked"""
+        response = self.client.post(
+            reverse("review-list"), review_body(1), content_type="application/json", HTTP_PREFER="respond-async"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "queued")
+        self.assertFalse(Review.objects.exists())
+        tracked = self.client.get(response["Location"])
+        self.assertEqual(tracked.status_code, status.HTTP_200_OK)
+        self.assertEqual(tracked.data["id"], response.data["id"])
+
+    @override_settings(REVIEW_SUBMISSIONS_ASYNC=True)
+    def test_HTTP400_when_invalid_review_is_submitted(self):
+        """Checks if the body is validated before it's queued"""
+        body = review_body(1)
+        body["stars"] = 10
+        response = self.client.post(reverse("review-list"), body, content_type="application/json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ReviewSubmission.objects.exists())
+
+    def test_submitted_review_is_created_by_worker(self):
+        """Checks if the worker creates the review, updates shop rating and the submission status"""
+        response = self.client.post(
+            reverse("review-list"), review_body(4), content_type="application/json", HTTP_PREFER="respond-async"
+        )
+
+        self.assertEqual(process_submissions(), 1)
+        review = Review.objects.get()
+        self.assertEqual((review.title, review.shop.domain_name), ("Review #4", "rozetka"))
+        self.assertEqual(Shop.objects.get().rating, 5)
+        tracked = self.client.get(response["Location"])
+        self.assertEqual(tracked.data["status"], "created")
+        self.assertIsNotNone(tracked.data["date_processed"])
+
+    def test_HTTP404_when_submission_does_not_exist(self):
+        """Checks if unknown tracking id isn't found"""
+        url = reverse("review-submission-detail", args=["00000000-0000-0000-0000-000000000000"])
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProcessBatchTest(TestCase):
+
+    def setUp(self):
+        shop_resolver.invalidate()
+
+    def test_batch_is_created_by_one_insert(self):
+        """Checks if a batch of submissions of different shops is created by one bulk insert"""
+        for number in range(3):
+            submit_review(review_body(number, link=f"https://shop{number}.com/"))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(process_batch(batch_size=10), 3)
+
+        review_inserts = [query for query in queries if query["sql"].startswith('INSERT INTO "reviews_review"')]
+        self.assertEqual(len(review_inserts), 1)
+        self.assertEqual(Review.objects.count(), 3)
+        self.assertEqual(ReviewSubmission.objects.filter(status="created").count(), 3)
+
+    def test_batch_size_and_order(self):
+        """Checks if the oldest submissions are processed first and a batch isn't larger than batch size"""
+        for number in range(3):
+            submit_review(review_body(number))
+
+        self.assertEqual(process_batch(batch_size=2), 2)
+        self.assertEqual(sorted(Review.objects.values_list("title", flat=True)), ["Review #0", "Review #1"])
+        self.assertEqual(process_batch(batch_size=2), 1)
+        self.assertEqual(process_batch(batch_size=2), 0)
+
+    def test_abandoned_submissions_are_claimed_again(self):
+        """Checks if submissions claimed by a crashed worker are processed after the claim timeout"""
+        submission = submit_review(review_body(1))
+        ReviewSubmission.objects.filter(pk=submission.pk).update(
+            status="processing", date_claimed=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(process_batch(), 0)
+
+        ReviewSubmission.objects.filter(pk=submission.pk).update(date_claimed=timezone.now() - timedelta(hours=1))
+        self.assertEqual(process_batch(), 1)
+        self.assertEqual(Review.objects.count(), 1)
+
+    def test_malformed_submissions_fail_alone(self):
+        """Checks if submissions, whose payload can't make a review, fail without holding back the rest of the batch"""
+        valid = submit_review(review_body(1))
+        unknown_field = ReviewSubmission.objects.create(payload={**review_body(2), "rating": 5})
+        no_link = ReviewSubmission.objects.create(payload={"title": "Review #3"})
+
+        with self.assertLogs("reviews.submissions", "ERROR"):
+            self.assertEqual(process_submissions(), 3)
+
+        statuses = dict(ReviewSubmission.objects.values_list("pk", "status"))
+        self.assertEqual(statuses, {valid.pk: "created", unknown_field.pk: "failed", no_link.pk: "failed"})
+        self.assertEqual(list(Review.objects.values_list("title", flat=True)), ["Review #1"])
+        self.assertIn("non_field_errors", ReviewSubmission.objects.get(pk=unknown_field.pk).errors)
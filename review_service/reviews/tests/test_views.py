@@ -1,11 +1,34 @@
-from django.test import TestCase
+import csv
+import io
+import json
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
-from ..models import Shop, Review
+from ..cache import result_cache
+from ..export import export_rows
+from ..fastpath import ValuesSerializer
+from ..ingest import ingest_reviews
+from ..models import Shop, ShopDailyStats, Review
+from ..ratings import rebuild_daily_stats, rebuild_ratings
+from ..renderers import NDJSONRenderer
+from ..serializers import ReviewSerializer
+from ..shops import shop_resolver
+
+
+class ViewTestCase(TestCase):
 
+    def setUp(self):
+        # Rows of previous tests are rolled back without signals, so nothing cached from them may be used
+        shop_resolver.invalidate()
+        cache.clear()
 
-class ShopListTest(TestCase):
+
+class ShopListTest(ViewTestCase):
 
     @classmethod
     def setUpTestData(cls):
@@ -44,6 +67,21 @@ class ShopListTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
 
+    def test_shops_search_when_search_is_passed(self):
+        """Checks if shops matching search are returned, the closest match goes first"""
+        Shop.objects.create(name="Rozetka market", domain_name="rozetkamarket", link="https://rozetkamarket.ua/")
+        response = self.client.get(self.url, {"search": "rozetka"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([shop["name"] for shop in response.data], ["Rozetka", "Rozetka market"])
+
+    def test_shops_search_when_nothing_matches(self):
+        """Checks if no shops are returned, when search matches nothing"""
+        response = self.client.get(self.url, {"search": "somethingwrong"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 0)
+
     def test_shops_order_when_order_is_asc_reviews(self):
         """Checks if ascending order by amount of reviews is used"""
         data = {
@@ -100,7 +138,7 @@ class ShopListTest(TestCase):
         self.assertEqual(response.data[1].get("name"), "Foxtrot")
 
 
-class ReviewViewSetTest(TestCase):
+class ReviewViewSetTest(ViewTestCase):
 
     @classmethod
     def setUpTestData(cls):
@@ -117,7 +155,7 @@ class ReviewViewSetTest(TestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 8)
+        self.assertEqual(len(response.data["results"]), 8)
 
     def test_review_list_when_author_is_passed(self):
         """
@@ -130,9 +168,9 @@ class ReviewViewSetTest(TestCase):
         response = self.client.get(url, data)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0].get("author_email"), "user3@email.com")
-        self.assertEqual(response.data[0].get("title"), "Review #3")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0].get("author_email"), "user3@email.com")
+        self.assertEqual(response.data["results"][0].get("title"), "Review #3")
 
     def test_review_list_when_wrong_author_is_passed(self):
         """Checks if empty list is returned, when wrong author is passed"""
@@ -143,40 +181,143 @@ class ReviewViewSetTest(TestCase):
         response = self.client.get(url, data)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data["results"]), 0)
+
+    def test_review_list_when_q_is_passed(self):
+        """Checks if reviews containing searched words in title or content are returned"""
+        shop = Shop.objects.get(name="Rozetka")
+        Review.objects.create(
+            title="Fast delivery", content="Bad package", shop=shop, stars=4, author_email="user3@email.com"
+        )
+        Review.objects.create(
+            title="Slow", content="Delivery took a month", shop=shop, stars=1, author_email="user4@email.com"
+        )
+        url = reverse("review-list")
+        response = self.client.get(url, {"q": "delivery"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({review["title"] for review in response.data["results"]}, {"Fast delivery", "Slow"})
+
+        response = self.client.get(url, {"q": "delivery", "author": "user3@email.com"})
+        self.assertEqual([review["title"] for review in response.data["results"]], ["Fast delivery"])
+
+    def test_review_list_pages_when_search_ranks_are_equal(self):
+        """Checks if id breaks ties between equally ranked reviews, so search pages have no gaps and duplicates"""
+        shop = Shop.objects.get(name="Rozetka")
+        for number in range(5):
+            Review.objects.create(
+                title="Fast delivery", content="Delivery took a day", shop=shop, stars=5,
+                author_email=f"buyer{number}@email.com"
+            )
+        response = self.client.get(reverse("review-list"), {"q": "delivery", "page_size": 2})
+        ids = []
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [review["id"] for review in response.data["results"]]
+            # Repeated pages would never end
+            self.assertLessEqual(len(ids), 5)
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+
+        expected = Review.objects.filter(title="Fast delivery").order_by("-id").values_list("id", flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_review_list_pages_when_page_size_is_passed(self):
+        """Checks if pages follow each other without gaps and duplicates, when next links are followed"""
+        url = reverse("review-list")
+        response = self.client.get(url, {"page_size": 3})
+        titles = []
+        pages = 0
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles += [review["title"] for review in response.data["results"]]
+            pages += 1
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(titles, [f"Review #{review_id}" for review_id in range(9, 1, -1)])
+
+    def test_review_list_previous_page(self):
+        """Checks if previous link returns the preceding page in the same order"""
+        url = reverse("review-list")
+        first_page = self.client.get(url, {"page_size": 3})
+        second_page = self.client.get(first_page.data["next"])
+        response = self.client.get(second_page.data["previous"])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], first_page.data["results"])
+        self.assertIsNone(response.data["previous"])
+
+    def test_review_list_pages_when_dates_are_equal(self):
+        """Checks if id breaks ties between reviews created at the same moment"""
+        Review.objects.update(date_created=Review.objects.first().date_created)
+        url = reverse("review-list")
+        first_page = self.client.get(url, {"page_size": 5})
+        second_page = self.client.get(first_page.data["next"])
+
+        ids = [review["id"] for review in first_page.data["results"] + second_page.data["results"]]
+        self.assertEqual(ids, sorted(Review.objects.values_list("id", flat=True), reverse=True))
+
+    def test_review_list_pages_when_shop_and_author_are_passed(self):
+        """Checks if pagination works within filtered reviews"""
+        url = reverse("review-list")
+        shop = Shop.objects.get(name="Foxtrot")
+        response = self.client.get(url, {"shop": shop.pk, "page_size": 2})
+
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+        response = self.client.get(response.data["next"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNone(response.data["next"])
+
+        response = self.client.get(url, {"shop": shop.pk, "author": "user5@email.com", "page_size": 2})
+        self.assertEqual([review["title"] for review in response.data["results"]], ["Review #5"])
+
+    def test_HTTP404_when_cursor_is_invalid(self):
+        """Checks if 404 Not Found is returned, when malformed cursor is passed"""
+        url = reverse("review-list")
+        response = self.client.get(url, {"cursor": "cD1ub3RoaW5n"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     # ------------------------------------CREATE----------------------
-    # def test_creation_response_when_valid_data_is_passed(self):
-    #     """Checks if correct response is returned, when valid data is passed in the request body"""
-    #     url = reverse("review-list")
-    #     data = {
-    #         "title": "Foxtrot is cool!",
-    #         "content": "Lalalalalalalal",
-    #         "stars": 4,
-    #         "author_email": "test@email.com",
-    #         "shop_link": "https://www.foxtrot.com.ua/"
-    #     }
-    #     response = self.client.post(url, data)
-    #
-    #     self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-    #     self.assertEqual(response.data.get("title"), "Foxtrot is cool!")
-    #     self.assertIsNotNone(Review.objects.filter(title="Foxtrot is cool!").first())
-    #     # shop creation
-    #     self.assertIsNotNone(Shop.objects.filter(name="Foxtrot").first())
-    #
-    # def test_HTTP400_when_invalid_data_is_passed(self):
-    #     """Checks if 400 Bad Request is triggered, when invalid data is passed in the request body"""
-    #     url = reverse("review-list")
-    #     data = {
-    #         "title": "Foxtrot is cool!",
-    #         "content": "Lalalalalalalal",
-    #         "stars": 4,
-    #         "author_email": "test@.com",
-    #         "shop_link": "https://www.foxtrot.com.ua/"
-    #     }
-    #     response = self.client.post(url, data)
-    #
-    #     self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    def test_creation_response_when_valid_data_is_passed(self):
+        """Checks if correct response is returned, when valid data is passed in the request body"""
+        url = reverse("review-list")
+        data = {
+            "title": "Foxtrot is cool!",
+            "content": "Lalalalalalalal",
+            "stars": 4,
+            "author_email": "test@email.com",
+            "shop_link": "https://www.foxtrot.com.ua/"
+        }
+        response = self.client.post(url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data.get("title"), "Foxtrot is cool!")
+        self.assertIsNotNone(Review.objects.filter(title="Foxtrot is cool!").first())
+        # shop creation
+        self.assertIsNotNone(Shop.objects.filter(name="Foxtrot").first())
+
+    def test_HTTP400_when_invalid_creation_data_is_passed(self):
+        """Checks if 400 Bad Request is triggered, when invalid data is passed in the request body"""
+        url = reverse("review-list")
+        data = {
+            "title": "Foxtrot is cool!",
+            "content": "Lalalalalalalal",
+            "stars": 4,
+            "author_email": "test@.com",
+            "shop_link": "https://comfy.ua/"
+        }
+        response = self.client.post(url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # Shop of an invalid review isn't created
+        self.assertFalse(Shop.objects.filter(domain_name="comfy").exists())
 
     # ------------------------------------PARTIAL UPDATE---------------------------
     def test_update_response_when_valid_data_is_passed(self):
@@ -190,6 +331,27 @@ class ReviewViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data.get("title"), "something new")
 
+    def test_update_reads_review_once(self):
+        """Checks if the review is fetched by one SELECT and the body is validated once"""
+        url = reverse("review-detail", args=[1])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, {"stars": 1}, content_type="application/json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        review_selects = [query for query in queries if query["sql"].startswith('SELECT "reviews_review"')]
+        self.assertEqual(len(review_selects), 1)
+
+    def test_update_moves_review_when_shop_link_is_passed(self):
+        """Checks if the review is moved to the shop of a passed link"""
+        url = reverse("review-detail", args=[1])
+        response = self.client.patch(
+            url, {"shop_link": "https://www.foxtrot.com.ua/ua/"}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["shop"], Shop.objects.get(domain_name="foxtrot").pk)
+        self.assertNotIn("shop_link", response.data)
+
     def test_HTTP400_when_invalid_data_is_passed(self):
         """Checks if 400 Bad Request is triggered, when invalid data is passed in the request body"""
         url = reverse("review-detail", args=[1])
@@ -216,6 +378,660 @@ class ReviewViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
+class ReviewBulkTest(ViewTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("review-bulk")
+        create_test_shops_and_reviews()
+
+    @staticmethod
+    def review_row(title, stars=4, shop_link="https://rozetka.com.ua/", author_email="bulk@email.com"):
+        return {
+            "title": title,
+            "content": "Lalalalalalalal",
+            "stars": stars,
+            "author_email": author_email,
+            "shop_link": shop_link
+        }
+
+    def test_bulk_creation_from_json_array(self):
+        """Checks if valid rows are created and invalid rows are reported, when JSON array is passed"""
+        rows = [
+            self.review_row("Bulk #1"),
+            self.review_row("Bulk #2", shop_link="https://www.citrus.ua/smartfony/"),
+            self.review_row("Bulk #3", author_email="wrongMail"),
+            self.review_row("Bulk #4", stars=5, shop_link="https://citrus.ua/"),
+        ]
+        response = self.client.post(self.url, json.dumps(rows), content_type="application/json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 3)
+        self.assertEqual(response.data["failed"], 1)
+        self.assertEqual(response.data["errors"][0]["row"], 2)
+        self.assertIn("author_email", response.data["errors"][0]["errors"])
+        self.assertFalse(Review.objects.filter(title="Bulk #3").exists())
+
+        citrus = Shop.objects.get(domain_name="citrus")
+        self.assertEqual(citrus.link, "https://www.citrus.ua/smartfony/")
+        self.assertEqual(citrus.reviews.count(), 2)
+        self.assertEqual(citrus.reviews_count, 2)
+        self.assertEqual(citrus.stars_sum, 9)
+        self.assertEqual(Shop.objects.get(name="Rozetka").reviews_count, 4)
+
+    def test_bulk_creation_from_ndjson_stream(self):
+        """Checks if every line is created, when NDJSON is passed, and malformed lines are reported"""
+        lines = [json.dumps(self.review_row(f"Bulk #{number}")) for number in range(5)]
+        lines.insert(2, "{not json")
+        response = self.client.post(self.url, "\n".join(lines) + "\n", content_type="application/x-ndjson")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 5)
+        self.assertEqual(response.data["failed"], 1)
+        self.assertEqual(response.data["errors"][0]["row"], 2)
+        self.assertEqual(Review.objects.filter(title__startswith="Bulk #").count(), 5)
+
+    def test_bulk_creation_in_chunks(self):
+        """Checks if rows of several chunks are all created"""
+        rows = (self.review_row(f"Bulk #{number}") for number in range(7))
+        report = ingest_reviews(rows, chunk_size=3)
+
+        self.assertEqual(report.created, 7)
+        self.assertEqual(Review.objects.filter(title__startswith="Bulk #").count(), 7)
+
+    def test_HTTP400_when_nothing_is_valid(self):
+        """Checks if 400 Bad Request is returned, when no row is valid"""
+        rows = [self.review_row("Bulk #1", stars=10)]
+        response = self.client.post(self.url, json.dumps(rows), content_type="application/json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["created"], 0)
+        self.assertIn("stars", response.data["errors"][0]["errors"])
+
+    def test_empty_bodies_create_nothing(self):
+        """Checks if an empty NDJSON stream, an empty body and an empty JSON array are handled the same way"""
+        for body, content_type in [("", "application/x-ndjson"), ("", "application/json"), ("[]", "application/json")]:
+            response = self.client.post(self.url, body, content_type=content_type)
+
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED, (body, content_type))
+            self.assertEqual(response.data["created"], 0)
+
+    def test_HTTP413_when_json_array_is_too_large(self):
+        """Checks if a JSON array over the limit is rejected, while the same rows are streamed as NDJSON"""
+        rows = [self.review_row(f"Bulk #{number}") for number in range(3)]
+        with override_settings(REVIEW_BULK_JSON_MAX_SIZE=len(json.dumps(rows)) - 1):
+            response = self.client.post(self.url, json.dumps(rows), content_type="application/json")
+            self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+            body = "\n".join(json.dumps(row) for row in rows)
+            response = self.client.post(self.url, body, content_type="application/x-ndjson")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.data["created"], 3)
+
+    def test_HTTP400_when_body_is_not_list(self):
+        """Checks if 400 Bad Request is returned, when JSON body isn't an array"""
+        response = self.client.post(self.url, json.dumps(self.review_row("Bulk")), content_type="application/json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTest(ViewTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_test_shops_and_reviews()
+
+    def test_HTTP304_when_review_list_is_not_modified(self):
+        """Checks if 304 Not Modified is returned without the main query, when ETag matches"""
+        url = reverse("review-list")
+        response = self.client.get(url)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_review_list_is_returned_when_review_is_changed(self):
+        """Checks if a full response with a new ETag is returned, when a review is updated or deleted"""
+        url = reverse("review-list")
+        etag = self.client.get(url)["ETag"]
+        review = Review.objects.first()
+        review.title = "something new"
+        review.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        Review.objects.order_by("date_updated").first().delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_filtered_review_list_isnt_aggregated(self):
+        """Checks if validators of a filtered list are read without counting the filtered reviews"""
+        url = reverse("review-list")
+        etag = self.client.get(url, {"author": "user3@email.com"})["ETag"]
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"author": "user3@email.com"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("COUNT(", queries[0]["sql"])
+
+    def test_review_list_etag_depends_on_query_params(self):
+        """Checks if ETag of a filtered list doesn't match the whole list"""
+        url = reverse("review-list")
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, {"author": "user3@email.com"}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_HTTP304_when_review_detail_is_not_modified(self):
+        """Checks if 304 Not Modified is returned for a detail, when If-Modified-Since is not older than it"""
+        review = Review.objects.first()
+        url = reverse("review-detail", args=[review.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_HTTP404_when_review_detail_does_not_exist(self):
+        """Checks if 404 Not Found is still returned for a wrong pk"""
+        response = self.client.get(reverse("review-detail", args=[100]), HTTP_IF_NONE_MATCH="*")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_HTTP304_when_shop_list_is_not_modified(self):
+        """Checks if 304 Not Modified is returned for shops, until a review changes their rating"""
+        url = reverse("shops")
+        etag = self.client.get(url, {"order": "rate"})["ETag"]
+
+        response = self.client.get(url, {"order": "rate"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Review.objects.create(
+            title="New", content="New", shop=Shop.objects.first(), stars=5, author_email="new@email.com"
+        )
+        response = self.client.get(url, {"order": "rate"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ResultCacheTest(ViewTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_test_shops_and_reviews()
+
+    def test_review_list_is_served_from_cache(self):
+        """Checks if a repeated request makes no queries and counts a hit"""
+        url = reverse("review-list")
+        stats = result_cache.stats
+        response = self.client.get(url, {"author": "user3@email.com"})
+
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(url, {"author": "user3@email.com"})
+        self.assertEqual(cached_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached_response.data, response.data)
+        self.assertEqual(cached_response["ETag"], response["ETag"])
+        self.assertEqual(result_cache.stats["misses"], stats["misses"] + 1)
+        self.assertEqual(result_cache.stats["hits"], stats["hits"] + 1)
+
+    def test_review_detail_is_invalidated_when_review_is_updated(self):
+        """Checks if a cached detail is dropped, when the review is changed"""
+        review = Review.objects.first()
+        url = reverse("review-detail", args=[review.pk])
+        self.client.get(url)
+        self.client.patch(url, {"title": "something new"}, content_type="application/json")
+
+        response = self.client.get(url)
+        self.assertEqual(response.data["title"], "something new")
+
+    def test_author_list_is_invalidated_precisely(self):
+        """Checks if a list of one author survives a change of another author's review"""
+        url = reverse("review-list")
+        self.client.get(url, {"author": "user3@email.com"})
+        self.client.get(url)
+        review = Review.objects.get(author_email="user4@email.com")
+        review.title = "something new"
+        review.save()
+
+        with self.assertNumQueries(0):
+            self.client.get(url, {"author": "user3@email.com"})
+        response = self.client.get(url)
+        self.assertIn("something new", [review["title"] for review in response.data["results"]])
+
+    def test_author_list_is_invalidated_when_author_is_changed(self):
+        """Checks if lists of both old and new author are dropped, when review's author is changed"""
+        url = reverse("review-list")
+        self.client.get(url, {"author": "user3@email.com"})
+        self.client.get(url, {"author": "new@email.com"})
+        review = Review.objects.get(author_email="user3@email.com")
+        review.author_email = "new@email.com"
+        review.save()
+
+        self.assertEqual(len(self.client.get(url, {"author": "user3@email.com"}).data["results"]), 0)
+        self.assertEqual(len(self.client.get(url, {"author": "new@email.com"}).data["results"]), 1)
+
+    def test_shop_list_is_invalidated_when_review_is_deleted(self):
+        """Checks if shops ordered by amount of reviews are reordered after a review is deleted"""
+        url = reverse("shops")
+        self.assertEqual(self.client.get(url, {"order": "-reviews"}).data[0]["name"], "Foxtrot")
+        for review in Review.objects.filter(shop__name="Foxtrot")[:3]:
+            review.delete()
+
+        self.assertEqual(self.client.get(url, {"order": "-reviews"}).data[0]["name"], "Rozetka")
+
+    def test_review_list_is_invalidated_after_bulk_write_commits(self):
+        """Checks if a list cached during an open bulk write is dropped only by the commit of the write"""
+        url = reverse("review-list")
+        self.client.get(url, {"author": "user3@email.com"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.filter(author_email="user3@email.com").bulk_modify(title="something new")
+            with self.assertNumQueries(0):
+                self.client.get(url, {"author": "user3@email.com"})
+
+        response = self.client.get(url, {"author": "user3@email.com"})
+        self.assertEqual(response.data["results"][0]["title"], "something new")
+
+    def test_review_list_isnt_invalidated_by_rolled_back_bulk_write(self):
+        """Checks if a rolled back bulk write leaves versions of cached lists as they are"""
+        url = reverse("review-list")
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Review.objects.all().bulk_delete()
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class SparseFieldsTest(ViewTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_test_shops_and_reviews()
+
+    def test_review_list_when_fields_are_passed(self):
+        """Checks if only passed fields are returned and content isn't read from the db"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("review-list"), {"fields": "id,title,stars,shop", "page_size": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data["results"][0]), ["id", "title", "stars", "shop"])
+        self.assertTrue(all('"content"' not in query["sql"] for query in queries))
+        # Cursor is still made of the ordering columns
+        next_page = self.client.get(response.data["next"])
+        self.assertEqual(len(next_page.data["results"]), 2)
+
+    def test_review_list_has_excerpts_without_content(self):
+        """Checks if lists don't read content unless it's asked for, while a detail returns it"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("review-list"), {"page_size": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("content", response.data["results"][0])
+        self.assertIn("excerpt", response.data["results"][0])
+        self.assertTrue(all('"content"' not in query["sql"] for query in queries))
+
+        review = response.data["results"][0]
+        asked = self.client.get(reverse("review-list"), {"fields": "id,content", "page_size": 2})
+        self.assertEqual(asked.data["results"][0]["content"], Review.objects.get(pk=review["id"]).content)
+        detail = self.client.get(reverse("review-detail", args=[review["id"]]))
+        self.assertEqual(detail.data["excerpt"], review["excerpt"])
+        self.assertIn("content", detail.data)
+
+    def test_review_detail_when_exclude_is_passed(self):
+        """Checks if excluded fields are neither returned nor read from the db"""
+        review = Review.objects.first()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("review-detail", args=[review.pk]), {"exclude": "content"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("content", response.data)
+        self.assertEqual(response.data["title"], review.title)
+        self.assertTrue(all('"content"' not in query["sql"] for query in queries))
+
+    def test_review_list_when_fields_are_passed_in_other_format(self):
+        """Checks if model instances are serialized with the passed fields too"""
+        response = self.client.get(reverse("review-list"), {"fields": "id,stars", "format": "api"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data["results"][0]), ["id", "stars"])
+
+    def test_shop_list_when_fields_are_passed(self):
+        """Checks if shops are returned with the passed fields only"""
+        response = self.client.get(reverse("shops"), {"fields": "id,name,rating"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data[0]), ["id", "name", "rating"])
+
+    def test_HTTP400_when_unknown_field_is_passed(self):
+        """Checks if 400 Bad Request is returned, when a field doesn't exist"""
+        response = self.client.get(reverse("review-list"), {"fields": "id,password"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_partial_update_ignores_fields(self):
+        """Checks if fields param doesn't trim fields of write requests"""
+        review = Review.objects.first()
+        response = self.client.patch(
+            f"{reverse('review-detail', args=[review.pk])}?fields=id", {"stars": 5}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["stars"], 5)
+        self.assertIn("content", response.data)
+
+
+class ReviewExportTest(ViewTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("review-export")
+        create_test_shops_and_reviews()
+
+    def test_ndjson_export_when_no_query_params(self):
+        """Checks if all reviews are streamed as NDJSON by default"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        # Unlike lists, exports have content
+        listed = self.client.get(reverse("review-list"), {"page_size": 100, "fields": ",".join(rows[0])})
+        self.assertEqual(rows, listed.data["results"])
+
+    def test_csv_export_when_shop_and_fields_are_passed(self):
+        """Checks if filtered reviews are streamed as CSV with a header of passed fields"""
+        shop = Shop.objects.get(name="Rozetka")
+        response = self.client.get(self.url, {"format": "csv", "shop": shop.pk, "fields": "id,title,stars"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ["id", "title", "stars"])
+        self.assertEqual(len(rows) - 1, Review.objects.filter(shop=shop).count())
+
+    def test_csv_export_is_negotiated_by_accept_header(self):
+        """Checks if CSV is streamed, when it's accepted"""
+        response = self.client.get(self.url, HTTP_ACCEPT="text/csv")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="reviews.csv"')
+
+    def test_rows_are_streamed_in_chunks(self):
+        """Checks if every chunk of rows is rendered on its own"""
+        chunks = list(export_rows(
+            Review.objects.order_by("id"), ValuesSerializer(ReviewSerializer()), NDJSONRenderer(), chunk_size=2
+        ))
+
+        self.assertEqual(len(chunks), (Review.objects.count() + 1) // 2)
+        self.assertTrue(all(chunk.count(b"\n") <= 2 for chunk in chunks))
+
+
+class ShopStatsTest(ViewTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = Shop.objects.create(name="Rozetka", domain_name="rozetka", link="https://rozetka.com.ua/")
+        cls.url = reverse("shop-stats", args=[cls.shop.pk])
+        # Monday 5, Tuesday 6 and Monday 12 of July, Sunday 1 of August
+        for day, stars in [("2021-07-05", [5, 4]), ("2021-07-06", [1]), ("2021-07-12", [5]), ("2021-08-01", [3])]:
+            histogram = {Shop.stars_field(star): stars.count(star) for star in set(stars)}
+            ShopDailyStats.objects.create(
+                shop=cls.shop, day=day, reviews_count=len(stars), stars_sum=sum(stars), **histogram
+            )
+
+    def test_daily_stats_within_range(self):
+        """Checks if days within the range are returned without reading reviews"""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"date_from": "2021-07-06", "date_to": "2021-07-12"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["bucket"], "day")
+        self.assertEqual(
+            [(str(row["period"]), row["reviews_count"], row["rating"]) for row in response.data["results"]],
+            [("2021-07-06", 1, 1.0), ("2021-07-12", 1, 5.0)]
+        )
+
+    def test_weekly_stats(self):
+        """Checks if days are summed by weeks starting on Monday"""
+        response = self.client.get(self.url, {"bucket": "week"})
+
+        self.assertEqual(
+            [(str(row["period"]), row["reviews_count"], row["stars_sum"]) for row in response.data["results"]],
+            [("2021-07-05", 3, 10), ("2021-07-12", 1, 5), ("2021-07-26", 1, 3)]
+        )
+
+    def test_monthly_stats(self):
+        """Checks if days are summed by months with histogram"""
+        response = self.client.get(self.url, {"bucket": "month"})
+
+        july = response.data["results"][0]
+        self.assertEqual(str(july["period"]), "2021-07-01")
+        self.assertEqual([july[Shop.stars_field(stars)] for stars in range(1, 6)], [1, 0, 0, 1, 2])
+        self.assertAlmostEqual(july["rating"], 15 / 4)
+
+    def test_HTTP400_when_query_params_are_invalid(self):
+        """Checks if unknown bucket and reversed range are rejected"""
+        self.assertEqual(self.client.get(self.url, {"bucket": "year"}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {"date_from": "2021-08-01", "date_to": "2021-07-01"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_HTTP404_when_shop_does_not_exist(self):
+        """Checks if stats of unknown shop aren't found"""
+        response = self.client.get(reverse("shop-stats", args=[self.shop.pk + 1]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(SHOP_RECENT_REVIEWS=2)
+class ShopDetailTest(ViewTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_test_shops_and_reviews()
+        cls.rozetka, cls.foxtrot = Shop.objects.get(name="Rozetka"), Shop.objects.get(name="Foxtrot")
+
+    def test_shop_with_rating_summary_and_latest_reviews(self):
+        """Checks if the shop has its rating summary and only its latest reviews from the newest"""
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("shop-detail", args=[self.foxtrot.pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["name"], "Foxtrot")
+        self.assertEqual(response.data["rating_summary"], {
+            "rating": 3.2, "reviews_count": 5, "stars": {"1": 0, "2": 1, "3": 2, "4": 2, "5": 0}
+        })
+        self.assertEqual([review["title"] for review in response.data["recent_reviews"]], ["Review #9", "Review #8"])
+        newest = Review.objects.get(title="Review #9")
+        detail = self.client.get(reverse("review-detail", args=[newest.pk]), {"exclude": "content"})
+        self.assertEqual(response.data["recent_reviews"][0], detail.data)
+
+    def test_HTTP404_when_shop_does_not_exist(self):
+        """Checks if unknown shop isn't found"""
+        self.assertEqual(self.client.get(reverse("shop-detail", args=[100])).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_expanded_by_one_query(self):
+        """Checks if latest reviews of all listed shops take one query besides the validator of reviews"""
+        with CaptureQueriesContext(connection) as plain:
+            self.client.get(reverse("shops"))
+        cache.clear()
+        with CaptureQueriesContext(connection) as expanded:
+            response = self.client.get(reverse("shops"), {"expand": "recent_reviews"})
+
+        self.assertEqual(len(expanded), len(plain) + 2)
+        recent_reviews = {
+            shop["name"]: [review["title"] for review in shop["recent_reviews"]] for shop in response.data
+        }
+        self.assertEqual(recent_reviews, {
+            "Rozetka": ["Review #4", "Review #3"], "Foxtrot": ["Review #9", "Review #8"]
+        })
+
+    def test_edited_review_changes_validators(self):
+        """Checks if editing an embedded review makes the shop modified, though the shop itself isn't changed"""
+        url = reverse("shop-detail", args=[self.rozetka.pk])
+        etag = self.client.get(url)["ETag"]
+        newest = Review.objects.get(title="Review #4")
+        self.client.patch(
+            reverse("review-detail", args=[newest.pk]), {"title": "Edited"}, content_type="application/json"
+        )
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["recent_reviews"][0]["title"], "Edited")
+
+    def test_HTTP400_when_expand_is_unknown(self):
+        """Checks if only known fields can be expanded"""
+        response = self.client.get(reverse("shops"), {"expand": "reviews"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BatchReadTest(ViewTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("batch")
+        create_test_shops_and_reviews()
+        cls.rozetka, cls.foxtrot = Shop.objects.get(name="Rozetka"), Shop.objects.get(name="Foxtrot")
+
+    def test_reviews_and_shops_are_read_by_one_query_each(self):
+        """Checks if representations are the same as details and keyed by ids in requested order"""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"reviews": "5,2", "shops": f"{self.foxtrot.pk}"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data["reviews"]), ["5", "2"])
+        self.assertEqual(response.data["reviews"]["2"], self.client.get(reverse("review-detail", args=[2])).data)
+        self.assertEqual(response.data["shops"][str(self.foxtrot.pk)]["name"], "Foxtrot")
+
+    def test_missing_ids_are_null(self):
+        """Checks if ids without rows are returned as null and only requested models are read"""
+        # Missing reviews are looked for in the archive too
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"reviews": "2,100"})
+
+        self.assertIsNone(response.data["reviews"]["100"])
+        self.assertNotIn("shops", response.data)
+
+    def test_HTTP400_when_ids_are_invalid(self):
+        """Checks if requests without ids, with malformed ids or with too many ids are rejected"""
+        for params in [{}, {"reviews": ""}, {"reviews": "1,a"}, {"shops": ",".join(map(str, range(1, 300)))}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class ReviewModerationTest(ViewTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.delete_url = reverse("review-bulk-delete")
+        cls.update_url = reverse("review-bulk-update")
+        create_test_shops_and_reviews()
+        cls.foxtrot = Shop.objects.get(name="Foxtrot")
+
+    def assertAggregatesConsistent(self):
+        """Checks if shop aggregates and daily stats equal ones rebuilt from reviews"""
+        def snapshot():
+            return (
+                list(Shop.objects.order_by("id").values("reviews_count", "stars_sum", "rating", "stars_1", "stars_5")),
+                list(ShopDailyStats.objects.order_by("shop", "day").values(
+                    "shop", "day", "reviews_count", "stars_sum"
+                )),
+            )
+        maintained = snapshot()
+        rebuild_ratings()
+        rebuild_daily_stats()
+        self.assertEqual(maintained, snapshot())
+
+    def test_bulk_delete_by_filter(self):
+        """Checks if reviews matching the filter are deleted by one DELETE and aggregates stay consistent"""
+        Review.objects.filter(pk=5).update(author_email="spam@email.com")
+        Review.objects.filter(pk=6).update(author_email="spam@email.com")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                self.delete_url, {"filter": {"author": "spam@email.com", "shop": self.foxtrot.pk}},
+                content_type="application/json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"deleted": 2})
+        self.assertFalse(Review.objects.filter(pk__in=[5, 6]).exists())
+        deletes = [query for query in queries if query["sql"].startswith('DELETE FROM "reviews_review"')]
+        self.assertEqual(len(deletes), 1)
+        self.assertAggregatesConsistent()
+
+    def test_bulk_delete_by_ids_invalidates_cache(self):
+        """Checks if cached lists and details of deleted reviews are dropped"""
+        list_url, detail_url = reverse("review-list"), reverse("review-detail", args=[2])
+        self.client.get(list_url)
+        self.client.get(detail_url)
+
+        response = self.client.post(self.delete_url, {"ids": [2, 3, 100]}, content_type="application/json")
+
+        self.assertEqual(response.data, {"deleted": 2})
+        self.assertEqual(len(self.client.get(list_url).data["results"]), Review.objects.count())
+        self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertAggregatesConsistent()
+
+    def test_bulk_update_of_stars(self):
+        """Checks if stars of selected reviews are set, rating and date_updated are changed"""
+        date_updated = Review.objects.get(pk=5).date_updated
+        response = self.client.post(
+            self.update_url, {"filter": {"shop": self.foxtrot.pk}, "set": {"stars": 1}}, content_type="application/json"
+        )
+
+        self.assertEqual(response.data, {"updated": 5})
+        self.assertEqual(set(Review.objects.filter(shop=self.foxtrot).values_list("stars", flat=True)), {1})
+        self.assertGreater(Review.objects.get(pk=5).date_updated, date_updated)
+        self.foxtrot.refresh_from_db()
+        self.assertEqual(self.foxtrot.rating, 1)
+        self.assertAggregatesConsistent()
+
+    def test_bulk_update_moves_reviews_to_shop_of_link(self):
+        """Checks if shop_link is resolved once and selected reviews are moved to its shop"""
+        response = self.client.post(
+            self.update_url, {"ids": [2, 3], "set": {"shop_link": "https://www.foxtrot.com.ua/"}},
+            content_type="application/json"
+        )
+
+        self.assertEqual(response.data, {"updated": 2})
+        self.assertEqual(set(Review.objects.filter(pk__in=[2, 3]).values_list("shop", flat=True)), {self.foxtrot.pk})
+        self.assertAggregatesConsistent()
+
+    def test_HTTP400_when_selection_is_invalid(self):
+        """Checks if everything can't be selected at once and unknown filters are rejected"""
+        for body in [{}, {"ids": []}, {"filter": {"autor": "user2@email.com"}}]:
+            response = self.client.post(self.delete_url, body, content_type="application/json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, body)
+        self.assertEqual(Review.objects.count(), 8)
+
+    def test_HTTP400_when_update_is_invalid(self):
+        """Checks if invalid or empty changes are rejected"""
+        for changes in [None, {}, {"stars": 10}, {"shop": 1}]:
+            response = self.client.post(self.update_url, {"ids": [2], "set": changes}, content_type="application/json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, changes)
+
+
 def create_test_shops_and_reviews():
     # Creating shops
     shop_1 = Shop.objects.create(
@@ -1,12 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import SimpleRouter
 
-from .views import ReviewViewSet, ShopList
+from .metrics import metrics_view
+from .views import BatchRead, ReviewSubmissionDetail, ReviewViewSet, ShopDetail, ShopList, ShopStats
 
 router = SimpleRouter()
 router.register(r"reviews", ReviewViewSet, 'review')
 
 urlpatterns = [
+    path("reviews/submissions/<uuid:pk>/", ReviewSubmissionDetail.as_view(), name="review-submission-detail"),
     path("", include(router.urls)),
-    path("shops/", ShopList.as_view(), name="shops")
+    path("shops/", ShopList.as_view(), name="shops"),
+    path("shops/<int:pk>/", ShopDetail.as_view(), name="shop-detail"),
+    path("shops/<int:pk>/stats/", ShopStats.as_view(), name="shop-stats"),
+    path("batch/", BatchRead.as_view(), name="batch"),
+    path("metrics/", metrics_view, name="metrics"),
 ]
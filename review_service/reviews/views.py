@@ -1,69 +1,242 @@
-from django.db.models import Count, Avg
-from rest_framework import generics
+from types import GeneratorType
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db.models import Max
+from django.http import Http404, StreamingHttpResponse
+from rest_framework import generics, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 
-import tldextract
-
-from .models import Review, Shop
-from .serializers import ReviewSerializer, ShopSerializer
+from .cache import review_namespace, reviews_namespace, SHOPS_NAMESPACE
+from .models import ArchivedReview, Review, ReviewSubmission, Shop
+from .ratings import get_shop_stats
+from .serializers import (
+    BatchQuerySerializer, BulkReviewSerializer, ChangesQuerySerializer, ReviewSelectionSerializer, ReviewSerializer,
+    ReviewSubmissionSerializer, ShopDetailSerializer, ShopSerializer, ShopStatsQuerySerializer, get_query_param_list
+)
+from .changes import START, encode_cursor, get_changes, get_last_change_dates
+from .export import export_rows
+from .fastpath import FastListMixin, ValuesSerializer
 from .filters import ShopsFilter, ReviewsFilter
+from .ingest import ingest_reviews
+from .mixins import CachedResponseMixin, ConditionalGetMixin, DeferredColumnsMixin, latest
+from .pagination import KeysetPagination
+from .parsers import LimitedJSONParser, NDJSONParser
+from .renderers import CSVRenderer, NDJSONRenderer
+from .submissions import submit_review
 
 
-class ReviewViewSet(ModelViewSet):
+class ReviewViewSet(CachedResponseMixin, ConditionalGetMixin, DeferredColumnsMixin, FastListMixin, ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = ReviewsFilter
+    pagination_class = KeysetPagination
     ordering_fields = []
-    ordering = ["-date_created"]
+    ordering = ["-date_created", "-id"]
 
-    def create(self, request, *args, **kwargs):
-        """Changes "shop_link" in request.data to "shop_id" for correct creating a new review"""
-        request.data["shop"] = 1
-        self.is_review_body_valid(self.get_serializer(data=request.data))  # checks if body data is valid
+    def get_keyset_ordering(self, queryset):
+        """Orders reviews found by full-text search from the most relevant, others from the newest"""
+        if "search_rank" in queryset.query.annotations:
+            return ["-search_rank", "-id"]
+        return self.ordering
 
-        shop_pk = self.get_shop_pk(request.data.pop("shop_link"))
-        request.data["shop"] = shop_pk
+    def get_object(self):
+        """Reviews moved to the archive are still retrieved by their pks, but they can't be changed"""
+        try:
+            return super().get_object()
+        except Http404:
+            if self.action != "retrieve":
+                raise
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            return generics.get_object_or_404(ArchivedReview.objects.all(), pk=self.kwargs[lookup_url_kwarg])
 
-        return super().create(request, *args, **kwargs)
+    def get_object_last_modified(self, lookup_value):
+        last_modified = super().get_object_last_modified(lookup_value)
+        if last_modified is None:
+            archived = ArchivedReview.objects.filter(pk=lookup_value)
+            last_modified = archived.values_list("date_updated", flat=True).first()
+        return last_modified
 
-    def partial_update(self, request, *args, **kwargs):
+    def get_list_validators(self, queryset):
         """
-        Changes "shop_link" in request.data to "shop_id" for correct updating a review,
-        if "shop_link" is in a request.data
+        Lists are validated by the latest update, deletion and archival of any review, so the filtered reviews
+        aren't aggregated before every page, however many of them there are
         """
-        self.is_review_body_valid(self.get_serializer(instance=self.get_object(), data=request.data, partial=True))
+        last_change_dates = get_last_change_dates()
+        return (latest(*last_change_dates), *last_change_dates)
 
-        if "shop_link" in request.data:
-            shop_pk = self.get_shop_pk(request.data.pop("shop_link"))
-            request.data["shop"] = shop_pk
+    def get_serializer_context(self):
+        """Lists represent reviews by excerpts, content is returned only by a detail or when it's asked for"""
+        context = super().get_serializer_context()
+        if self.action == "list":
+            context["default_exclude"] = ["content"]
+        return context
 
-        return super().partial_update(request, *args, **kwargs)
+    def get_cache_namespaces(self, request, *args, **kwargs):
+        """A detail depends only on the review, a list filtered by author only on reviews of the author"""
+        if self.action == "retrieve":
+            return [review_namespace(kwargs[self.lookup_url_kwarg or self.lookup_field])]
+        return [reviews_namespace(request.query_params.get("author"))]
+
+    def create(self, request, *args, **kwargs):
+        """Creates a review or, in the async create mode, queues it"""
+        if self.is_async_create(request):
+            return self.accept_review(request)
+        return super().create(request, *args, **kwargs)
 
     @staticmethod
-    def get_shop_pk(link: str):
-        """Gets or creates shop with domain_name provided in link and returns a shop's pk"""
-        domain_name = tldextract.extract(link).domain
-        shop, created = Shop.objects.get_or_create(name=domain_name.capitalize(), domain_name=domain_name)
-        if created:
-            shop.link = link
-            shop.save()
+    def is_async_create(request):
+        return settings.REVIEW_SUBMISSIONS_ASYNC or "respond-async" in request.headers.get("Prefer", "")
 
-        return shop.pk
+    def accept_review(self, request):
+        """Validates review body and queues it, responds with 202 Accepted and a submission to track"""
+        serializer = BulkReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        submission = submit_review(serializer.validated_data)
 
-    @staticmethod
-    def is_review_body_valid(serializer: ReviewSerializer):
-        """Checks if passed serializer is valid, otherwise raises 400 Bad Request"""
+        location = reverse("review-submission-detail", args=[submission.pk], request=request)
+        return Response(
+            ReviewSubmissionSerializer(submission).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": location, "Preference-Applied": "respond-async"},
+        )
+
+    @action(detail=False, methods=["post"], parser_classes=[LimitedJSONParser, NDJSONParser])
+    def bulk(self, request, *args, **kwargs):
+        """
+        Creates reviews from a JSON array or an NDJSON stream of review bodies with "shop_link",
+        returns amount of created and failed reviews with errors of failed rows. Only NDJSON is read
+        chunk by chunk, a JSON array is limited by REVIEW_BULK_JSON_MAX_SIZE. An empty body is an empty list
+        """
+        # DRF doesn't run parsers for an empty body and returns {} instead
+        rows = [] if request.stream is None else request.data
+        if not isinstance(rows, (list, GeneratorType)):
+            raise ValidationError({"non_field_errors": ["Expected a list of reviews."]})
+
+        report = ingest_reviews(rows)
+        if report.created or not report.failed:
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response(report.data, status=response_status)
+
+    @action(detail=False, methods=["post"], url_path="bulk-delete")
+    def bulk_delete(self, request, *args, **kwargs):
+        """Deletes reviews selected by "ids" and "filter" with set-based queries, returns amount of deleted ones"""
+        queryset = self.get_selected_queryset(request.data)
+        return Response({"deleted": queryset.bulk_delete()})
+
+    @action(detail=False, methods=["post"], url_path="bulk-update")
+    def bulk_update(self, request, *args, **kwargs):
+        """
+        Updates reviews selected by "ids" and "filter" with fields from "set", which are validated like PATCH body,
+        returns amount of updated reviews
+        """
+        queryset = self.get_selected_queryset(request.data)
+        changes = request.data.get("set")
+        if not isinstance(changes, dict) or not changes:
+            raise ValidationError({"set": ["Expected fields to update."]})
+        serializer = self.get_serializer(data=changes, partial=True)
         serializer.is_valid(raise_exception=True)
+        if not serializer.validated_data:
+            raise ValidationError({"set": ["No writable fields to update."]})
 
+        updated = serializer.write_with_shop(lambda: queryset.bulk_modify(**serializer.validated_data))
+        return Response({"updated": updated})
+
+    @staticmethod
+    def get_selected_queryset(data):
+        """Returns reviews selected for bulk moderation, raises 400 Bad Request on invalid selection"""
+        selection = ReviewSelectionSerializer(data=data)
+        selection.is_valid(raise_exception=True)
+
+        queryset = Review.objects.all()
+        if "ids" in selection.validated_data:
+            queryset = queryset.filter(pk__in=selection.validated_data["ids"])
+        if "filter" in selection.validated_data:
+            filterset = ReviewsFilter(data=selection.validated_data["filter"], queryset=queryset)
+            if not filterset.is_valid():
+                raise ValidationError({"filter": filterset.errors})
+            queryset = filterset.qs
+        return queryset
+
+    @action(detail=False, methods=["get"])
+    def changes(self, request, *args, **kwargs):
+        """
+        Change feed for mirrors of reviews: reviews created or updated and tombstones of deleted ones
+        after "cursor" from the oldest. Every page has a cursor to continue from, an empty one is returned
+        when a consumer has caught up, and the same cursor gets later changes afterwards
+        """
+        query = ChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        changes, cursor, has_more = get_changes(
+            query.validated_data.get("cursor", START), query.validated_data["limit"],
+            ValuesSerializer(self.get_serializer())
+        )
 
-class ShopList(generics.ListAPIView):
+        encoded = encode_cursor(cursor)
+        next_url = request.build_absolute_uri(
+            f"{request.path}?{urlencode({**request.query_params.dict(), 'cursor': encoded})}"
+        )
+        return Response({"results": changes, "cursor": encoded, "next": next_url, "has_more": has_more})
+
+    @action(detail=False, methods=["get"], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request, *args, **kwargs):
+        """
+        Streams all reviews, which match the list filters, as NDJSON or CSV picked by Accept header
+        or "format" query param, first rows are sent before the rest are read
+        """
+        renderer = request.accepted_renderer
+        queryset = self.filter_queryset(self.get_queryset())
+        # Rows are read after the view returns, so the database is picked while the request is routed
+        queryset = queryset.using(queryset.db)
+        content_type = f"{renderer.media_type}; charset={renderer.charset}" if renderer.charset else renderer.media_type
+
+        response = StreamingHttpResponse(
+            export_rows(queryset, ValuesSerializer(self.get_serializer()), renderer), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="reviews.{renderer.format}"'
+        return response
+
+
+class RecentReviewsMixin:
+    """
+    Shop views with the latest reviews embedded into shops, their validators also depend on reviews,
+    because editing a review doesn't touch its shop
+    """
+
+    def get_embedded_last_modified(self):
+        if self.get_serializer_class() is not ShopDetailSerializer:
+            return None
+        return Review.objects.aggregate(last_modified=Max("date_updated"))["last_modified"]
+
+
+class ShopList(
+    RecentReviewsMixin, CachedResponseMixin, ConditionalGetMixin, DeferredColumnsMixin, generics.ListAPIView
+):
     model = Shop
-    serializer_class = ShopSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = ShopsFilter
+    expandable = ["recent_reviews"]
+
+    def get_cache_namespaces(self, request, *args, **kwargs):
+        return [SHOPS_NAMESPACE]
+
+    def get_serializer_class(self):
+        """?expand=recent_reviews embeds the latest reviews of every listed shop, read by one query"""
+        expand = get_query_param_list(self.request, "expand")
+        unknown = [name for name in expand if name not in self.expandable]
+        if unknown:
+            raise ValidationError({"expand": [f"Unknown fields: {', '.join(unknown)}."]})
+        return ShopDetailSerializer if expand else ShopSerializer
 
     def get_queryset(self):
         """
@@ -73,10 +246,69 @@ class ShopList(generics.ListAPIView):
         order = self.request.query_params.get("order", " ")
         way = "-" if order[0] == "-" else ""
         if order == "reviews" or order == "-reviews":
-            ordered_shops = Shop.objects.annotate(num_reviews=Count("reviews")).order_by(f"{way}num_reviews")
+            ordered_shops = Shop.objects.order_by(f"{way}reviews_count")
         elif order == "rate" or order == "-rate":
-            ordered_shops = Shop.objects.annotate(avg_rate=Avg("reviews__stars")).order_by(f"{way}avg_rate")
+            ordered_shops = Shop.objects.order_by(f"{way}rating")
         else:
             ordered_shops = Shop.objects.all()
 
         return ordered_shops
+
+
+class ShopDetail(RecentReviewsMixin, CachedResponseMixin, ConditionalGetMixin, generics.RetrieveAPIView):
+    """Shop with its rating summary and its latest reviews"""
+    queryset = Shop.objects.all()
+    serializer_class = ShopDetailSerializer
+
+    def get_cache_namespaces(self, request, *args, **kwargs):
+        return [SHOPS_NAMESPACE]
+
+
+class ShopStats(generics.GenericAPIView):
+    """Reviews volume and rating of a shop by days, weeks or months, read only from shops' daily stats"""
+    queryset = Shop.objects.only("pk")
+
+    def get(self, request, *args, **kwargs):
+        query = ShopStatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        shop = self.get_object()
+
+        return Response({
+            "shop": shop.pk,
+            "bucket": query.validated_data["bucket"],
+            "results": get_shop_stats(shop.pk, **query.validated_data),
+        })
+
+
+class ReviewSubmissionDetail(generics.RetrieveAPIView):
+    """Status of a review submitted in the async create mode"""
+    queryset = ReviewSubmission.objects.all()
+    serializer_class = ReviewSubmissionSerializer
+
+
+class BatchRead(generics.GenericAPIView):
+    """
+    Reviews and shops by lists of ids in one request, e.g. ?reviews=1,2&shops=3.
+    Every model is read by one IN query, reviews missing from Review are read from the archive by one more.
+    Results are keyed by id and missing ids are null
+    """
+    resources = {"reviews": ((Review, ArchivedReview), ReviewSerializer), "shops": ((Shop,), ShopSerializer)}
+
+    def get(self, request, *args, **kwargs):
+        query = BatchQuerySerializer(data=request.query_params, context={"request": request})
+        query.is_valid(raise_exception=True)
+
+        results = {}
+        for name, ids in query.validated_data.items():
+            models, serializer_class = self.resources[name]
+            values_serializer = ValuesSerializer(serializer_class())
+            columns = dict.fromkeys([*values_serializer.columns, "pk"])
+            found = {}
+            for model in models:
+                missing = [pk for pk in ids if pk not in found]
+                if not missing:
+                    break
+                rows = list(model.objects.filter(pk__in=missing).values(*columns))
+                found.update(zip([row["pk"] for row in rows], values_serializer.to_representation(rows)))
+            results[name] = {str(pk): found.get(pk) for pk in ids}
+        return Response(results)